@@ -0,0 +1,37 @@
+import pytest
+
+from app import create_app
+from db_config import db, REPLICA_BIND
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite file, schema built from the models."""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///%s' % (tmp_path / 'primary.db'))
+    monkeypatch.delenv('DATABASE_REPLICA_URL', raising=False)
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """
+    The app with a primary and a 'replica' bind on two SQLite files, both
+    with the full schema but nothing replicated between them.
+    """
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///%s' % (tmp_path / 'primary.db'))
+    monkeypatch.setenv('DATABASE_REPLICA_URL', 'sqlite:///%s' % (tmp_path / 'replica.db'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -1,5 +1,59 @@
+import functools
+import os
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs of @read_only routes to the 'replica' bind when one
+    is configured. Flushes and INSERT/UPDATE/DELETE statements always go to
+    the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and has_app_context()
+            and g.get('use_replica')
+            and REPLICA_BIND in self._db.engines
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def read_only(view):
+    """Mark a route as read-only so its queries may be served by the replica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
 
-db = SQLAlchemy()
 
-# You can add database initialization functions heres
\ No newline at end of file
+def engine_options(url):
+    """
+    Pool settings from the environment: DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING. SQLite gets only
+    pre-ping, since its pools do not take the sizing options.
+    """
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+    if not url.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            # below MySQL's default wait_timeout so idle connections are not dropped under us
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+        })
+    return options
@@ -0,0 +1,137 @@
+"""baseline schema
+
+Revision ID: 4b1d0c9e2a61
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+Databases created before migrations were tracked already have these tables;
+mark them with `flask db stamp 4b1d0c9e2a61` and then run `flask db upgrade`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1d0c9e2a61'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('USER',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('sname', sa.String(length=255), nullable=True),
+    sa.Column('password', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=50), nullable=True),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('BUS',
+    sa.Column('license_plate', sa.String(length=20), nullable=False),
+    sa.Column('model', sa.String(length=255), nullable=True),
+    sa.Column('capacity', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('license_plate')
+    )
+    op.create_table('STOP',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('ADMIN',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.ForeignKeyConstraint(['email'], ['USER.email'], ),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('EMPLOYEE',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('department', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['email'], ['USER.email'], ),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('CUSTOMER',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['email'], ['USER.email'], ),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('STOP_CONNECTION',
+    sa.Column('from_stop', sa.String(length=255), nullable=False),
+    sa.Column('to_stop', sa.String(length=255), nullable=False),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['from_stop'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['to_stop'], ['STOP.name'], ),
+    sa.PrimaryKeyConstraint('from_stop', 'to_stop')
+    )
+    op.create_table('DRIVER',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('driver_license', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['email'], ['EMPLOYEE.email'], ),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('SUPPORT',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.ForeignKeyConstraint(['email'], ['EMPLOYEE.email'], ),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_table('TRIP',
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('date_time', sa.String(length=25), nullable=True),
+    sa.Column('current_capacity', sa.Integer(), nullable=True),
+    sa.Column('bus_license_plate', sa.String(length=20), nullable=True),
+    sa.Column('driver_email', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['bus_license_plate'], ['BUS.license_plate'], ),
+    sa.ForeignKeyConstraint(['driver_email'], ['DRIVER.email'], ),
+    sa.PrimaryKeyConstraint('trip_id')
+    )
+    op.create_table('CUSTOMER_TRIP',
+    sa.Column('customer_trip_id', sa.Integer(), nullable=False),
+    sa.Column('cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('refunded_credit', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('trip_id', sa.Integer(), nullable=True),
+    sa.Column('start_position', sa.String(length=255), nullable=True),
+    sa.Column('end_position', sa.String(length=255), nullable=True),
+    sa.Column('customer', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.ForeignKeyConstraint(['end_position'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['start_position'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['TRIP.trip_id'], ),
+    sa.PrimaryKeyConstraint('customer_trip_id')
+    )
+    op.create_table('FEEDBACK',
+    sa.Column('feedback_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('trip_id', sa.Integer(), nullable=True),
+    sa.Column('support', sa.String(length=255), nullable=True),
+    sa.Column('customer', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.ForeignKeyConstraint(['support'], ['SUPPORT.email'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['TRIP.trip_id'], ),
+    sa.PrimaryKeyConstraint('feedback_id')
+    )
+    op.create_table('INCLUDES',
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('stop_order', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['name'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['TRIP.trip_id'], ),
+    sa.PrimaryKeyConstraint('trip_id', 'name')
+    )
+
+
+def downgrade():
+    op.drop_table('INCLUDES')
+    op.drop_table('FEEDBACK')
+    op.drop_table('CUSTOMER_TRIP')
+    op.drop_table('TRIP')
+    op.drop_table('SUPPORT')
+    op.drop_table('DRIVER')
+    op.drop_table('STOP_CONNECTION')
+    op.drop_table('CUSTOMER')
+    op.drop_table('EMPLOYEE')
+    op.drop_table('ADMIN')
+    op.drop_table('STOP')
+    op.drop_table('BUS')
+    op.drop_table('USER')
@@ -0,0 +1,96 @@
+"""add segment time, bus position, id block, idempotency, ledger and stats tables
+
+Revision ID: 8e3f5a7c1b24
+Revises: 4b1d0c9e2a61
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3f5a7c1b24'
+down_revision = '4b1d0c9e2a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('SEGMENT_TIME',
+    sa.Column('segment_time_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=True),
+    sa.Column('from_stop', sa.String(length=255), nullable=True),
+    sa.Column('to_stop', sa.String(length=255), nullable=True),
+    sa.Column('seconds', sa.Float(), nullable=True),
+    sa.Column('recorded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['from_stop'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['to_stop'], ['STOP.name'], ),
+    sa.ForeignKeyConstraint(['trip_id'], ['TRIP.trip_id'], ),
+    sa.PrimaryKeyConstraint('segment_time_id')
+    )
+    op.create_table('BUS_POSITION',
+    sa.Column('bus_position_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('recorded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['trip_id'], ['TRIP.trip_id'], ),
+    sa.PrimaryKeyConstraint('bus_position_id')
+    )
+    op.create_table('ID_BLOCK',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('IDEMPOTENCY_KEY',
+    sa.Column('customer', sa.String(length=255), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('customer_trip_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.ForeignKeyConstraint(['customer_trip_id'], ['CUSTOMER_TRIP.customer_trip_id'], ),
+    sa.PrimaryKeyConstraint('customer', 'idempotency_key')
+    )
+    op.create_table('BALANCE_LEDGER',
+    sa.Column('entry_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('customer', sa.String(length=255), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('customer_trip_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.ForeignKeyConstraint(['customer_trip_id'], ['CUSTOMER_TRIP.customer_trip_id'], ),
+    sa.PrimaryKeyConstraint('entry_id')
+    )
+    with op.batch_alter_table('BALANCE_LEDGER', schema=None) as batch_op:
+        batch_op.create_index('ix_balance_ledger_customer_entry', ['customer', 'entry_id'], unique=False)
+
+    op.create_table('BALANCE_SNAPSHOT',
+    sa.Column('customer', sa.String(length=255), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('last_entry_id', sa.Integer(), nullable=False),
+    sa.Column('compacted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.PrimaryKeyConstraint('customer')
+    )
+    op.create_table('CUSTOMER_STATS',
+    sa.Column('customer', sa.String(length=255), nullable=False),
+    sa.Column('refunded_total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('ride_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['customer'], ['CUSTOMER.email'], ),
+    sa.PrimaryKeyConstraint('customer')
+    )
+
+
+def downgrade():
+    op.drop_table('CUSTOMER_STATS')
+    op.drop_table('BALANCE_SNAPSHOT')
+    with op.batch_alter_table('BALANCE_LEDGER', schema=None) as batch_op:
+        batch_op.drop_index('ix_balance_ledger_customer_entry')
+
+    op.drop_table('BALANCE_LEDGER')
+    op.drop_table('IDEMPOTENCY_KEY')
+    op.drop_table('ID_BLOCK')
+    op.drop_table('BUS_POSITION')
+    op.drop_table('SEGMENT_TIME')
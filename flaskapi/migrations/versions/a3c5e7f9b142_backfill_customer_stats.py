@@ -0,0 +1,34 @@
+"""give every customer a CUSTOMER_STATS row
+
+Revision ID: a3c5e7f9b142
+Revises: f1d84b6e0a57
+Create Date: 2026-10-18 10:20:00.000000
+
+New customers get their row when they are created; this fills in the ones
+created before, summed from their rides, so start_trip only ever updates it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b142'
+down_revision = 'f1d84b6e0a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text(
+        'INSERT INTO CUSTOMER_STATS (customer, refunded_total, ride_count) '
+        'SELECT c.email, COALESCE(SUM(ct.refunded_credit), 0), COUNT(ct.customer_trip_id) '
+        'FROM CUSTOMER c '
+        'LEFT JOIN CUSTOMER_TRIP ct ON ct.customer = c.email '
+        'WHERE NOT EXISTS (SELECT 1 FROM CUSTOMER_STATS s WHERE s.customer = c.email) '
+        'GROUP BY c.email'
+    ))
+
+
+def downgrade():
+    # Rows are kept: they hold the same totals the old lazy backfill computed
+    pass
@@ -0,0 +1,26 @@
+"""index SEGMENT_TIME by segment for loading the newest samples
+
+Revision ID: b6d2f8a4c930
+Revises: a3c5e7f9b142
+Create Date: 2026-10-18 10:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a4c930'
+down_revision = 'a3c5e7f9b142'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('SEGMENT_TIME', schema=None) as batch_op:
+        batch_op.create_index('ix_segment_time_segment', ['from_stop', 'to_stop', 'segment_time_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('SEGMENT_TIME', schema=None) as batch_op:
+        batch_op.drop_index('ix_segment_time_segment')
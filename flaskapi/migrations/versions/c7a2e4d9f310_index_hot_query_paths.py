@@ -0,0 +1,42 @@
+"""index customer trips, stop sequences and feedback lookups
+
+Revision ID: c7a2e4d9f310
+Revises: 8e3f5a7c1b24
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e4d9f310'
+down_revision = '8e3f5a7c1b24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('CUSTOMER_TRIP', schema=None) as batch_op:
+        batch_op.create_index('ix_customer_trip_customer', ['customer'], unique=False)
+        batch_op.create_index('ix_customer_trip_trip_id', ['trip_id'], unique=False)
+
+    with op.batch_alter_table('INCLUDES', schema=None) as batch_op:
+        batch_op.create_index('ix_includes_trip_order', ['trip_id', 'stop_order'], unique=False)
+
+    with op.batch_alter_table('FEEDBACK', schema=None) as batch_op:
+        batch_op.create_index('ix_feedback_support', ['support'], unique=False)
+        batch_op.create_index('ix_feedback_customer', ['customer'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('FEEDBACK', schema=None) as batch_op:
+        batch_op.drop_index('ix_feedback_customer')
+        batch_op.drop_index('ix_feedback_support')
+
+    with op.batch_alter_table('INCLUDES', schema=None) as batch_op:
+        batch_op.drop_index('ix_includes_trip_order')
+
+    with op.batch_alter_table('CUSTOMER_TRIP', schema=None) as batch_op:
+        batch_op.drop_index('ix_customer_trip_trip_id')
+        batch_op.drop_index('ix_customer_trip_customer')
@@ -0,0 +1,106 @@
+"""store TRIP.date_time as an indexed DATETIME
+
+Revision ID: f1d84b6e0a57
+Revises: c7a2e4d9f310
+Create Date: 2026-10-18 10:15:00.000000
+
+Existing strings are parsed into a new column before the old one is dropped.
+If any value cannot be parsed the migration stops and lists the trips, so no
+row loses its time; fix those values and run the upgrade again.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d84b6e0a57'
+down_revision = 'c7a2e4d9f310'
+branch_labels = None
+depends_on = None
+
+# Accepted besides ISO 8601 (same list as utils/datetimes.py)
+INPUT_FORMATS = ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S')
+BATCH_SIZE = 1000
+
+
+def _parse(value):
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _convert(source, convert):
+    """
+    [(trip_id, converted value)] for every non-blank TRIP.source, read before
+    any DDL runs so that a bad value aborts with the table untouched.
+    """
+    trip = sa.table('TRIP', sa.column('trip_id', sa.Integer), source)
+    rows = op.get_bind().execute(sa.select(trip.c.trip_id, source).where(source.isnot(None))).all()
+
+    converted, bad = [], []
+    for trip_id, value in rows:
+        if isinstance(value, str) and not value.strip():
+            continue
+        new_value = convert(value)
+        if new_value is None:
+            bad.append(trip_id)
+        else:
+            converted.append((trip_id, new_value))
+    if bad:
+        raise RuntimeError('TRIP.date_time could not be parsed for trip_id %s' % ', '.join(map(str, bad)))
+    return converted
+
+
+def _write(target, converted):
+    trip = sa.table('TRIP', sa.column('trip_id', sa.Integer), target)
+    statement = (
+        trip.update()
+        .where(trip.c.trip_id == sa.bindparam('b_trip_id'))
+        .values({target.name: sa.bindparam('b_value')})
+    )
+    params = [{'b_trip_id': trip_id, 'b_value': value} for trip_id, value in converted]
+    for start in range(0, len(params), BATCH_SIZE):
+        op.get_bind().execute(statement, params[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    converted = _convert(sa.column('date_time', sa.String(25)), _parse)
+
+    with op.batch_alter_table('TRIP', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('date_time_parsed', sa.DateTime(), nullable=True))
+
+    _write(sa.column('date_time_parsed', sa.DateTime()), converted)
+
+    with op.batch_alter_table('TRIP', schema=None) as batch_op:
+        batch_op.drop_column('date_time')
+        batch_op.alter_column('date_time_parsed', new_column_name='date_time',
+                              existing_type=sa.DateTime(), existing_nullable=True)
+
+    with op.batch_alter_table('TRIP', schema=None) as batch_op:
+        batch_op.create_index('ix_trip_date_time', ['date_time'], unique=False)
+
+
+def downgrade():
+    converted = _convert(sa.column('date_time', sa.DateTime()),
+                         lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+
+    with op.batch_alter_table('TRIP', schema=None) as batch_op:
+        batch_op.drop_index('ix_trip_date_time')
+        batch_op.add_column(sa.Column('date_time_text', sa.String(length=25), nullable=True))
+
+    _write(sa.column('date_time_text', sa.String(25)), converted)
+
+    with op.batch_alter_table('TRIP', schema=None) as batch_op:
+        batch_op.drop_column('date_time')
+        batch_op.alter_column('date_time_text', new_column_name='date_time',
+                              existing_type=sa.String(length=25), existing_nullable=True)
@@ -82,7 +82,7 @@ class Trip(db.Model):
     __tablename__ = 'TRIP'
     
     trip_id = db.Column(db.Integer, primary_key=True)
-    date_time = db.Column(db.String(25))
+    date_time = db.Column(db.DateTime)
     current_capacity = db.Column(db.Integer)
     bus_license_plate = db.Column(db.String(20), ForeignKey('BUS.license_plate'))
     driver_email = db.Column(db.String(255), ForeignKey('DRIVER.email'))
@@ -95,6 +95,10 @@ class Trip(db.Model):
     customer_trips = db.relationship('CustomerTrip', back_populates='trip')
     feedbacks = db.relationship('Feedback', back_populates='trip')
 
+    __table_args__ = (
+        db.Index('ix_trip_date_time', 'date_time'),
+    )
+
 
 class Driver(db.Model):
     __tablename__ = 'DRIVER'
@@ -120,6 +124,10 @@ class Includes(db.Model):
     trip = db.relationship('Trip', back_populates='includes')
     stop = db.relationship('Stop', back_populates='included_in')
 
+    __table_args__ = (
+        db.Index('ix_includes_trip_order', 'trip_id', 'stop_order'),
+    )
+
 
 class CustomerTrip(db.Model):
     __tablename__ = 'CUSTOMER_TRIP'
@@ -146,6 +154,11 @@ class CustomerTrip(db.Model):
       back_populates='customer_trips',
       foreign_keys=[customer_email]
     )
+
+    __table_args__ = (
+        db.Index('ix_customer_trip_customer', 'customer'),
+        db.Index('ix_customer_trip_trip_id', 'trip_id'),
+    )
     
 class Feedback(db.Model):
     __tablename__ = 'FEEDBACK'
@@ -161,6 +174,11 @@ class Feedback(db.Model):
     support_feedback = db.relationship('Support', back_populates='feedbacks', foreign_keys=[support])
     customer_feedback = db.relationship('Customer', back_populates='feedbacks', foreign_keys=[customer])
 
+    __table_args__ = (
+        db.Index('ix_feedback_support', 'support'),
+        db.Index('ix_feedback_customer', 'customer'),
+    )
+
 class StopConnection(db.Model):
     __tablename__ = 'STOP_CONNECTION'
     from_stop = db.Column(db.String(255), db.ForeignKey('STOP.name'), primary_key=True)
@@ -170,3 +188,62 @@ class StopConnection(db.Model):
     # Relationships
     from_stop_rel = db.relationship('Stop', foreign_keys=[from_stop], back_populates='from_connections')
     to_stop_rel = db.relationship('Stop', foreign_keys=[to_stop], back_populates='to_connections')
+
+class SegmentTime(db.Model):
+    __tablename__ = 'SEGMENT_TIME'
+    segment_time_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('TRIP.trip_id'))
+    from_stop = db.Column(db.String(255), db.ForeignKey('STOP.name'))
+    to_stop = db.Column(db.String(255), db.ForeignKey('STOP.name'))
+    seconds = db.Column(db.Float)
+    recorded_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_segment_time_segment', 'from_stop', 'to_stop', 'segment_time_id'),
+    )
+
+class BusPosition(db.Model):
+    __tablename__ = 'BUS_POSITION'
+    bus_position_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('TRIP.trip_id'))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    recorded_at = db.Column(db.DateTime)
+
+class IdBlock(db.Model):
+    __tablename__ = 'ID_BLOCK'
+    name = db.Column(db.String(64), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False)
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'IDEMPOTENCY_KEY'
+    customer = db.Column(db.String(255), db.ForeignKey('CUSTOMER.email'), primary_key=True)
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    customer_trip_id = db.Column(db.Integer, db.ForeignKey('CUSTOMER_TRIP.customer_trip_id'))
+    created_at = db.Column(db.DateTime)
+
+class BalanceLedger(db.Model):
+    __tablename__ = 'BALANCE_LEDGER'
+    entry_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    customer = db.Column(db.String(255), db.ForeignKey('CUSTOMER.email'), nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    customer_trip_id = db.Column(db.Integer, db.ForeignKey('CUSTOMER_TRIP.customer_trip_id'))
+    created_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_balance_ledger_customer_entry', 'customer', 'entry_id'),
+    )
+
+class BalanceSnapshot(db.Model):
+    __tablename__ = 'BALANCE_SNAPSHOT'
+    customer = db.Column(db.String(255), db.ForeignKey('CUSTOMER.email'), primary_key=True)
+    balance = db.Column(db.Numeric(10, 2), nullable=False)
+    last_entry_id = db.Column(db.Integer, nullable=False)
+    compacted_at = db.Column(db.DateTime)
+
+class CustomerStats(db.Model):
+    __tablename__ = 'CUSTOMER_STATS'
+    customer = db.Column(db.String(255), db.ForeignKey('CUSTOMER.email'), primary_key=True)
+    refunded_total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    ride_count = db.Column(db.Integer, nullable=False, default=0)
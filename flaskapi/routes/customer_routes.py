@@ -1,22 +1,47 @@
 from flask import Blueprint, request, jsonify
-from db_config import db
+from db_config import db, read_only
 from models.models import Customer, User 
 from models.models import Includes 
-from models.models import CustomerTrip, Stop
-from sqlalchemy import func
+from models.models import CustomerTrip, Stop, Trip, IdempotencyKey, BalanceSnapshot, CustomerStats
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload
+from utils.pagination import parse_limit, encode_cursor, decode_id_cursor, paginated_response
+from utils.ndjson import wants_ndjson, ndjson_response
+from utils.datetimes import format_date_time
+from services.fares import compute_fare, fare_engine
+from services.ids import customer_trip_ids
+from services.ledger import ledger, TOPUP, FARE, REFUND, ADJUSTMENT
+from services import customer_stats
+from services.occupancy import occupancy
+from utils.response_cache import response_cache
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
 
 customer_bp = Blueprint('customer', __name__)
 
-@customer_bp.route('/', methods=['GET'])
-def get_customers():
-    customers = Customer.query.all()
-    return jsonify([{
+def _customer_to_dict(row):
+    customer, balance = row
+    return {
         'email': customer.email,
-        'balance': customer.balance,
+        'balance': float(balance),  # snapshot + newer ledger rows, as in get_customer
         'name': customer.user.name,  # Accessing related User data
         'sname': customer.user.sname,
         'phone': customer.user.phone
-    } for customer in customers])
+    }
+
+@customer_bp.route('/', methods=['GET'])
+def get_customers():
+    # User is joined into the same SELECT instead of one query per customer
+    query = (
+        db.session.query(Customer, ledger.balance_expression())
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.customer == Customer.email)
+        .options(joinedload(Customer.user))
+        .order_by(Customer.email)
+    )
+    if wants_ndjson(request.args):
+        return ndjson_response(query, _customer_to_dict)
+    return jsonify([_customer_to_dict(customer) for customer in query])
 
 @customer_bp.route('/', methods=['POST'])
 def create_customer():
@@ -38,6 +63,7 @@ def create_customer():
             balance=data.get('balance', 0.00)
         )
         db.session.add(customer)
+        customer_stats.open_account(data['email'])
         
         db.session.commit()
         return jsonify({'message': 'Customer created successfully'}), 201
@@ -53,7 +79,7 @@ def get_customer(email):
 
     return jsonify({
         'email':   customer.email,
-        'balance': float(customer.balance),   # ← cast to float
+        'balance': float(ledger.balance(email)),   # snapshot + newer ledger rows
         'name':    customer.user.name,
         'sname':   customer.user.sname,
         'phone':   customer.user.phone,
@@ -67,9 +93,22 @@ def update_customer(email):
     if not customer:
         return jsonify({'error':'Customer not found'}),404
 
+    # Bakiye asla üzerine yazılmaz, ledger'a satır eklenir
+    try:
+        if 'top_up' in data:
+            top_up = Decimal(str(data['top_up']))
+            if top_up <= 0:
+                return jsonify({'error': 'top_up must be positive'}), 400
+            ledger.post(email, top_up, TOPUP)
+        elif 'balance' in data:
+            # Eski istemciler mutlak bakiye gönderir; farkı düzeltme olarak yaz
+            delta = Decimal(str(data['balance'])) - ledger.balance(email)
+            if delta:
+                ledger.post(email, delta, ADJUSTMENT)
+    except InvalidOperation:
+        return jsonify({'error': 'Invalid amount'}), 400
+
     # let’s update any fields present…
-    if 'balance' in data:
-        customer.balance = data['balance']
     if 'name' in data or 'sname' in data or 'phone' in data:
         user = customer.user
         if 'name'  in data: user.name  = data['name']
@@ -79,7 +118,7 @@ def update_customer(email):
 
     return jsonify({
       'email':   customer.email,
-      'balance': float(customer.balance),
+      'balance': float(ledger.balance(email)),
       'name':    customer.user.name,
       'sname':   customer.user.sname,
       'phone':   customer.user.phone
@@ -97,28 +136,101 @@ def start_trip(email):
 
     if not (start and end and trip_id):
         return jsonify({'error': 'Missing data'}), 400
+    if start == end:
+        return jsonify({'error': 'A ride must end at a different stop than it starts'}), 400
+    try:
+        trip_id = int(trip_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'trip_id must be an integer'}), 400
+
+    # Aynı tuşa tekrar basılırsa (zayıf bağlantı, retry) ikinci yolculuk açma
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if idempotency_key is not None and not isinstance(idempotency_key, str):
+        return jsonify({'error': 'Idempotency key must be a string'}), 400
+    if idempotency_key and len(idempotency_key) > 64:
+        return jsonify({'error': 'Idempotency key too long'}), 400
 
     customer = Customer.query.get(email)
     if not customer:
         return jsonify({'error': 'Customer not found'}), 404
 
-    # En büyük mevcut customer_trip_id'yi bul
-    max_id = db.session.query(func.max(CustomerTrip.customer_trip_id)).scalar() or 0
-    new_id = max_id + 1
-
-    # Yeni kayıt oluştur
-    new_trip = CustomerTrip(
-        customer_trip_id=new_id,
-        customer_email=email,
-        start_position=start,
-        end_position=end,
-        trip_id=trip_id,
-        refunded_credit=0,
-        cost=15
-    )
+    # A retry of a ride that was already saved gets its answer before taking a seat or an id
+    existing = IdempotencyKey.query.get((email, idempotency_key)) if idempotency_key else None
+    if existing:
+        return jsonify({'message': 'Trip added', 'trip_id': existing.customer_trip_id}), 200
 
-    db.session.add(new_trip)
-    db.session.commit()
+    # Koltuk: yolculuğun en kalabalık bölümünde yer yoksa binişi reddet.
+    # board() seferin satırını kilitler; commit ya da rollback bırakır
+    try:
+        accepted, peak_load, capacity = occupancy.board(trip_id, start, end)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    if not accepted:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Bus is full on part of this ride',
+            'capacity': capacity,
+            'peak_load': peak_load,
+        }), 409
+
+    try:
+        # ID'ler süreç başına ayrılan bloklardan gelir, max()+1 yok
+        new_id = customer_trip_ids.next_id()
+
+        # Ücreti yazarken bir kere hesapla; okuma tarafı sadece okur.
+        # Fiyat bellekteki fare matrisinden gelir, bağlantı yoksa eski kurala düş.
+        fare = fare_engine.fare_for_ride(start, end)
+        if fare is None:
+            orders = dict(
+                db.session.query(Includes.name, Includes.stop_order)
+                .filter(Includes.trip_id == trip_id, Includes.name.in_([start, end]))
+                .all()
+            )
+            fare = compute_fare(orders.get(start), orders.get(end))
+        cost, refunded_credit = fare
+
+        # Yeni kayıt oluştur
+        new_trip = CustomerTrip(
+            customer_trip_id=new_id,
+            customer_email=email,
+            start_position=start,
+            end_position=end,
+            trip_id=trip_id,
+            refunded_credit=refunded_credit,
+            cost=cost
+        )
+
+        db.session.add(new_trip)
+
+        # Bakiye satırı kilitlenmez: tam ücret düşülür, kullanılmayan kısım iade edilir
+        ledger.post(email, -(Decimal(str(cost)) + Decimal(str(refunded_credit))), FARE, new_id)
+        if refunded_credit:
+            ledger.post(email, refunded_credit, REFUND, new_id)
+        customer_stats.record_ride(email, refunded_credit)
+        # Trip.current_capacity tracks the busiest segment's load, counted from
+        # CUSTOMER_TRIP (this ride included) while the trip row is locked
+        Trip.query.filter_by(trip_id=trip_id).update({'current_capacity': occupancy.peak(trip_id)})
+        if idempotency_key:
+            db.session.add(IdempotencyKey(
+                customer=email,
+                idempotency_key=idempotency_key,
+                customer_trip_id=new_id,
+                created_at=datetime.utcnow()
+            ))
+
+        db.session.commit()
+        # the cached trip details show current_capacity
+        response_cache.bump(('trip', trip_id))
+    except IntegrityError:
+        db.session.rollback()
+        existing = IdempotencyKey.query.get((email, idempotency_key)) if idempotency_key else None
+        if not existing:
+            raise
+        return jsonify({'message': 'Trip added', 'trip_id': existing.customer_trip_id}), 200
+    except Exception:
+        db.session.rollback()
+        raise
 
     return jsonify({'message': 'Trip added', 'trip_id': new_id}), 201
 
@@ -129,12 +241,12 @@ def start_trip(email):
 @customer_bp.route('/<email>/refunded-total', methods=['GET'])
 def get_total_refunded_credit(email):
     try:
-        customer = Customer.query.get(email)
-        if not customer:
+        if not db.session.query(Customer.email).filter_by(email=email).first():
             return jsonify({'error': 'Customer not found'}), 404
 
-        total = sum(float(ct.refunded_credit or 0) for ct in customer.customer_trips)
-        return jsonify({'refunded_credit': round(total, 2)})
+        # Running total kept up to date by start_trip, no per-ride scan
+        total, _ = customer_stats.totals(email)
+        return jsonify({'refunded_credit': round(float(total), 2)})
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -142,44 +254,145 @@ def get_total_refunded_credit(email):
 
 
 @customer_bp.route('/<email>/trips', methods=['GET'])
+@read_only
 def get_customer_trips(email):
-    customer = Customer.query.get(email)
+    """
+    Ride history of a customer, newest first, one page at a time.
+
+    Fares are stored when the ride is written (see start_trip), so this
+    endpoint is read-only. Stop orders come from a single query that joins
+    INCLUDES twice (start and end stop) for the whole page.
+
+    Query params:
+      limit  - page size (default 50, max 500)
+      cursor - the X-Next-Cursor value returned with the previous page
+    """
+    if not db.session.query(Customer.email).filter_by(email=email).first():
+        return jsonify({'error': 'Customer not found'}), 404
+
+    try:
+        trips, next_cursor = _ride_page(email, parse_limit(request.args), request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return paginated_response(trips, next_cursor)
+
+
+def _ride_page(email, limit, cursor=None):
+    """
+    One page of a customer's rides, newest first, as (rides, next_cursor).
+    Raises ValueError for a malformed cursor.
+    """
+    start_inc = aliased(Includes)
+    end_inc = aliased(Includes)
+    query = (
+        db.session.query(
+            CustomerTrip,
+            Trip.date_time,
+            start_inc.stop_order,
+            end_inc.stop_order,
+        )
+        .outerjoin(Trip, Trip.trip_id == CustomerTrip.trip_id)
+        .outerjoin(start_inc, and_(start_inc.trip_id == CustomerTrip.trip_id,
+                                   start_inc.name == CustomerTrip.start_position))
+        .outerjoin(end_inc, and_(end_inc.trip_id == CustomerTrip.trip_id,
+                                 end_inc.name == CustomerTrip.end_position))
+        .filter(CustomerTrip.customer_email == email)
+        .order_by(CustomerTrip.customer_trip_id.desc())
+    )
+
+    if cursor:
+        last_id = decode_id_cursor(cursor)
+        query = query.filter(CustomerTrip.customer_trip_id < last_id)
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     trips = []
-    for ct in customer.customer_trips:
-        # Stop order hesapla
-        start_order = db.session.query(Includes.stop_order)\
-            .filter(Includes.trip_id == ct.trip_id, Includes.name == ct.start_position)\
-            .scalar()
-
-        end_order = db.session.query(Includes.stop_order)\
-            .filter(Includes.trip_id == ct.trip_id, Includes.name == ct.end_position)\
-            .scalar()
-
-        if start_order is not None and end_order is not None:
-            refunded_credit = abs(end_order - start_order)
-            cost = 15 - refunded_credit
-
-            # ✨ Veritabanına yaz
-            ct.refunded_credit = refunded_credit
-            ct.cost = cost
-
-        else:
-            refunded_credit = 0
-            cost = 15
-            ct.refunded_credit = 0
-            ct.cost = 15
+    for ct, date_time, start_order, end_order in rows:
+        cost, refunded_credit = ct.cost, ct.refunded_credit
+        if cost is None:
+            # Rides written before fares were stored at write time
+            cost, refunded_credit = compute_fare(start_order, end_order)
 
         trips.append({
-            'trip_id':        ct.trip_id,
-            'date_time':      ct.trip.date_time if ct.trip else "Unknown",
-            'cost':           float(cost),
-            'refunded_credit': float(refunded_credit),
-            'start_position': ct.start_stop.name if ct.start_stop else "Unknown",
-            'end_position':   ct.end_stop.name if ct.end_stop else "Unknown",
+            'customer_trip_id': ct.customer_trip_id,
+            'trip_id':          ct.trip_id,
+            'date_time':        format_date_time(date_time) if date_time is not None else "Unknown",
+            'cost':             float(cost),
+            'refunded_credit':  float(refunded_credit or 0),
+            'start_position':   ct.start_position or "Unknown",
+            'end_position':     ct.end_position or "Unknown",
+            'start_order':      start_order,
+            'end_order':        end_order,
         })
 
-    db.session.commit()  # 🧠 Veritabanına hem cost hem refund kaydolur
-    return jsonify(trips)
+    next_cursor = encode_cursor([rows[-1][0].customer_trip_id]) if has_more else None
+    return trips, next_cursor
+
+
+DASHBOARD_FIELDS = ('profile', 'rides', 'refunds')
+
 
+@customer_bp.route('/<email>/dashboard', methods=['GET'])
+def get_dashboard(email):
+    """
+    Profile, recent rides and refund totals in one response, from two
+    queries in the same transaction: one row joining the customer, user,
+    balance snapshot and stats, then one page of rides.
 
+    Served by the primary, not the replica: the app reloads it right after
+    boarding and must see its own ride, balance and refunds.
+
+    Query params:
+      fields - comma-separated subset of profile, rides, refunds (default all)
+      limit  - rides per page (default 50, max 500)
+      cursor - rides.next_cursor from the previous response
+    """
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(DASHBOARD_FIELDS)
+    unknown = [f for f in fields if f not in DASHBOARD_FIELDS]
+    if unknown:
+        return jsonify({'error': 'Unknown fields: ' + ', '.join(unknown)}), 400
+
+    row = (
+        db.session.query(
+            User.name, User.sname, User.phone,
+            ledger.balance_expression(),
+            CustomerStats.refunded_total, CustomerStats.ride_count,
+        )
+        .select_from(Customer)
+        .join(User, User.email == Customer.email)
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.customer == Customer.email)
+        .outerjoin(CustomerStats, CustomerStats.customer == Customer.email)
+        .filter(Customer.email == email)
+        .first()
+    )
+    if row is None:
+        return jsonify({'error': 'Customer not found'}), 404
+    name, sname, phone, balance, refunded_total, ride_count = row
+
+    dashboard = {}
+    if 'profile' in fields:
+        dashboard['profile'] = {
+            'email':   email,
+            'balance': float(balance),
+            'name':    name,
+            'sname':   sname,
+            'phone':   phone,
+        }
+    if 'rides' in fields:
+        try:
+            rides, next_cursor = _ride_page(email, parse_limit(request.args), request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        dashboard['rides'] = {'items': rides, 'next_cursor': next_cursor}
+    if 'refunds' in fields:
+        if refunded_total is None:
+            # Customer created before stats rows existed: sum the ride history
+            refunded_total, ride_count = customer_stats.totals(email)
+        dashboard['refunds'] = {
+            'refunded_credit': round(float(refunded_total), 2),
+            'ride_count':      ride_count,
+        }
+    return jsonify(dashboard)
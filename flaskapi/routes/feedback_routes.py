@@ -1,43 +1,117 @@
-from flask import Blueprint, request, jsonify
-from sqlalchemy import func
-from db_config import db
-from models.models import Feedback, Support, User, Trip
+from flask import Blueprint, Response, request, jsonify
+from db_config import db, read_only
+from sqlalchemy.orm import joinedload
+from models.models import Feedback, Support, User, Trip, Customer, Employee
+from utils.ndjson import wants_ndjson, ndjson_response
+from utils.pagination import parse_limit, encode_cursor, decode_id_cursor, paginated_response
+from services.support_queue import support_assigner
+from services.feedback_events import feedback_events
 
 feedback_bp = Blueprint('feedback', __name__)
 
+def _feedback_query():
+    # Customer -> User and Support -> Employee -> User are all many-to-one,
+    # so they are joined into the same SELECT
+    return Feedback.query.options(
+        joinedload(Feedback.customer_feedback).joinedload(Customer.user),
+        joinedload(Feedback.support_feedback)
+            .joinedload(Support.employee)
+            .joinedload(Employee.user),
+    )
+
+def _feedback_to_dict(fb):
+    customer_user = fb.customer_feedback.user if fb.customer_feedback else None
+    support_user = fb.support_feedback.employee.user if fb.support_feedback and fb.support_feedback.employee else None
+
+    return {
+        'feedback_id': fb.feedback_id,
+        'comment' : fb.comment,
+        'response': fb.response,
+        'trip_id':  fb.trip_id,
+        'support' : {
+            'email': support_user.email,
+            'name' : support_user.name,
+            'sname': support_user.sname,
+                    }if support_user else None,
+        'customer':{
+            'email': customer_user.email,
+            'name' : customer_user.name,
+            'sname': customer_user.sname,
+                  }if customer_user else None,
+    }
+
+def _answered_arg():
+    """?answered= as True, False or None (no filter)."""
+    answered = request.args.get('answered', '').lower()
+    if answered in ('true', '1', 'yes'):
+        return True
+    if answered in ('false', '0', 'no'):
+        return False
+    return None
+
 @feedback_bp.route('/', methods=['GET'])
+@read_only
 def get_feedbacks():
+    """
+    Support inbox, ordered by feedback_id, one page at a time.
+
+    Query params:
+      support  - only feedback assigned to this agent
+      answered - 'true' for answered feedback, 'false' for open feedback
+      limit    - page size (default 50, max 500)
+      cursor   - the X-Next-Cursor value returned with the previous page
+      format   - 'ndjson' streams every match instead of one page
+    """
     try:
-        feedbacks = Feedback.query.all()
-
-        feedback_list = []
-        for fb in feedbacks:
-            customer_user = fb.customer_feedback.user if fb.customer_feedback else None
-            support_user = fb.support_feedback.employee.user if fb.support_feedback and fb.support_feedback.employee else None
-          
-            feedback_list.append({
-            'feedback_id': fb.feedback_id,
-            'comment' : fb.comment,
-            'response': fb.response,
-            'trip_id':  fb.trip_id,
-            'support' : {
-                'email': support_user.email,
-                'name' : support_user.name,
-                'sname': support_user.sname,
-                        }if support_user else None,
-            'customer':{
-                'email': customer_user.email,
-                'name' : customer_user.name,
-                'sname': customer_user.sname,
-                      }if customer_user else None, 
-})
-
-        return jsonify(feedback_list), 200
+        query = _feedback_query().order_by(Feedback.feedback_id)
+
+        support_email = request.args.get('support')
+        if support_email:
+            query = query.filter(Feedback.support == support_email)
+        answered = _answered_arg()
+        if answered is True:
+            query = query.filter(Feedback.response.isnot(None))
+        elif answered is False:
+            query = query.filter(Feedback.response.is_(None))
+
+        if wants_ndjson(request.args):
+            return ndjson_response(query, _feedback_to_dict)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                last_id = decode_id_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(Feedback.feedback_id > last_id)
+
+        # Fetch one extra row to know whether there is a next page
+        limit = parse_limit(request.args)
+        feedbacks = query.limit(limit + 1).all()
+        has_more = len(feedbacks) > limit
+        feedbacks = feedbacks[:limit]
+
+        next_cursor = encode_cursor([feedbacks[-1].feedback_id]) if has_more else None
+        return paginated_response([_feedback_to_dict(fb) for fb in feedbacks], next_cursor)
     
     except Exception as e:
         print("Error:", e)
         return jsonify({'error': str(e)}), 500
 
+@feedback_bp.route('/stream', methods=['GET'])
+def stream_feedbacks():
+    """
+    Server-Sent Events for the inbox of ?support=<email> (every inbox if
+    omitted): 'created' for new feedback, 'reassigned' when feedback moves
+    between agents. Each event's data is the feedback as listed by GET /.
+    ?answered= filters events the same way it filters GET /.
+    """
+    return Response(
+        feedback_events.stream(request.args.get('support') or None, _answered_arg()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 @feedback_bp.route('/<int:feedback_id>', methods=['PATCH'])
 def update_feedback(feedback_id):
     try:
@@ -52,19 +126,55 @@ def update_feedback(feedback_id):
         if not feedback:
             return jsonify({'error': 'Feedback not found'}), 404
 
+        was_open = feedback.response is None
+        assigned_to = feedback.support
+
         feedback.response = response_text
         if support_email:
             feedback.support = support_email  
 
-        db.session.commit()
+        if was_open:
+            # The assigned agent has one ticket less
+            support_assigner.close(assigned_to)
 
+        db.session.commit()
         return jsonify({'message': 'Feedback updated with response'}), 200
 
     except Exception as e:
         db.session.rollback()
+        support_assigner.reload()
         print("Error while patching feedback:", e)
         return jsonify({'error': str(e)}), 500
 
+@feedback_bp.route('/rebalance', methods=['POST'])
+def rebalance_feedback():
+    """
+    Even out the support queues: move open tickets from the busiest agent
+    to the idlest one until they are less than REBALANCE_GAP apart. Both
+    inboxes get a 'reassigned' event per moved ticket.
+    """
+    moved = []
+    try:
+        while True:
+            result = support_assigner.rebalance()
+            if result is None:
+                break
+            moved.append(result)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        support_assigner.reload()
+        print("Error while rebalancing feedback:", e)
+        return jsonify({'error': str(e)}), 500
+
+    for ticket, moved_from in moved:
+        # One inbox gains the ticket, the other loses it
+        feedback_events.publish('reassigned', _feedback_to_dict(ticket), [moved_from, ticket.support])
+    return jsonify({'moved': [
+        {'feedback_id': ticket.feedback_id, 'from': moved_from, 'to': ticket.support}
+        for ticket, moved_from in moved
+    ]}), 200
+
 @feedback_bp.route('/', methods=['POST'])
 def create_feedback():
     data = request.get_json() or {}
@@ -76,20 +186,27 @@ def create_feedback():
     
     trip_id = 1
 
-    # pick a random support staff
-    support = Support.query.order_by(func.random()).first()
-    if not support:
+    # the agent with the fewest open tickets
+    support_email = support_assigner.assign()
+    if not support_email:
         return jsonify({'error': 'No support staff available'}), 500
 
     fb = Feedback(
         comment  = comment,
         customer = customer_email,
-        support  = support.email,
+        support  = support_email,
         trip_id  = trip_id,
         response = None
     )
     db.session.add(fb)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        support_assigner.close(support_email)
+        return jsonify({'error': str(e)}), 500
+
+    feedback_events.publish('created', _feedback_to_dict(fb), [fb.support])
 
     return jsonify({
         'feedback_id': fb.feedback_id,
@@ -0,0 +1,44 @@
+import zipfile
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from db_config import read_only
+from services.gtfs import export_feed, import_feed, GtfsImportError
+
+gtfs_bp = Blueprint('gtfs', __name__)
+
+@gtfs_bp.route('/export', methods=['GET'])
+@read_only
+def export_gtfs():
+    """
+    The whole network as one GTFS zip (stops, trips, stop_times, fares),
+    streamed while it is being written.
+    """
+    return Response(
+        stream_with_context(export_feed()),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=gtfs.zip'},
+    )
+
+@gtfs_bp.route('/import', methods=['POST'])
+def import_gtfs():
+    """
+    Load a GTFS zip, sent as a multipart 'file' or as the raw request body.
+    ?skip_existing=1 skips stops, fares and trips that already exist.
+    Trips without a derivable departure are skipped and listed in 'warnings'.
+    """
+    upload = request.files.get('file')
+    data = upload.read() if upload else request.get_data()
+    if not data:
+        return jsonify({'error': 'No GTFS zip provided'}), 400
+
+    skip_existing = request.args.get('skip_existing', '').lower() in ('1', 'true', 'yes')
+    try:
+        result = import_feed(data, skip_existing=skip_existing)
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Not a zip file'}), 400
+    except GtfsImportError as e:
+        return jsonify({'error': 'Validation failed', 'file': e.filename, 'rows': e.errors}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify(result), 201
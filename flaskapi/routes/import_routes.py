@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from services.bulk_import import SPECS, parse, import_rows, ImportValidationError
+
+import_bp = Blueprint('import', __name__)
+
+@import_bp.route('/<kind>', methods=['POST'])
+def bulk_import(kind):
+    """
+    Bulk-load stops, connections, trips or includes (stop sequences).
+
+    Send CSV (text/csv, or a multipart 'file' ending in .csv) or a JSON
+    array of objects. Every row is validated before anything is written;
+    if any row is bad nothing is inserted and the errors are returned.
+    ?skip_existing=1 skips rows whose key already exists instead.
+    """
+    if kind not in SPECS:
+        return jsonify({'error': 'Unknown kind, expected one of: ' + ', '.join(SPECS)}), 404
+
+    upload = request.files.get('file')
+    if upload:
+        data = upload.read()
+        fmt = 'csv' if upload.filename.lower().endswith('.csv') else 'json'
+    else:
+        data = request.get_data()
+        fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'json'
+
+    try:
+        rows = parse(data, fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    skip_existing = request.args.get('skip_existing', '').lower() in ('1', 'true', 'yes')
+    try:
+        result = import_rows(kind, rows, skip_existing=skip_existing)
+    except ImportValidationError as e:
+        return jsonify({'error': 'Validation failed', 'rows': e.errors}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify(result), 201
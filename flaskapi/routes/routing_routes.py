@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from services.routing import router
+
+routing_bp = Blueprint('routing', __name__)
+
+@routing_bp.route('', methods=['GET'])
+@routing_bp.route('/', methods=['GET'])
+def get_route():
+    """
+    Cheapest and fewest-hops paths between two stops over STOP_CONNECTION.
+    Computed in-process, no third-party routing service involved.
+    """
+    from_stop = request.args.get('from')
+    to_stop = request.args.get('to')
+    if not from_stop or not to_stop:
+        return jsonify({'error': 'from and to are required'}), 400
+
+    result = router.route(from_stop, to_stop)
+    if result is None:
+        return jsonify({'error': 'Stop not found'}), 404
+    if result['cheapest'] is None:
+        return jsonify({'error': 'No route between these stops'}), 404
+
+    return jsonify({
+        'from': from_stop,
+        'to': to_stop,
+        'cheapest': result['cheapest'],
+        'fewest_hops': result['fewest_hops'],
+    })
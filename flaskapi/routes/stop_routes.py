@@ -1,11 +1,22 @@
 from flask import Blueprint, request, jsonify
-from db_config import db
-from models.models import Stop, Includes
+from db_config import db, read_only
+from models.models import Stop, Includes, StopConnection
+from services.fares import fare_engine
+from services.routing import router
+from services.shapes import shape_store
+from services.map_matching import map_matcher
+from services.stop_index import stop_index
+from services.trip_search import trip_search
+from services.occupancy import occupancy
+from utils.response_cache import response_cache
+import math
 
 stop_bp = Blueprint('stop_bp', __name__, url_prefix='/stops')
 
 # Get all stops
 @stop_bp.route('/', methods=['GET'])
+@response_cache.cached('stops')
+@read_only
 def get_stops():
     stops = Stop.query.all()
     return jsonify([{
@@ -14,8 +25,90 @@ def get_stops():
         'latitude': s.latitude
     } for s in stops])
 
+# Stops closest to a point, served from the in-memory grid index
+@stop_bp.route('/nearest', methods=['GET'])
+def get_nearest_stops():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return jsonify({'error': 'lat and lon are required'}), 400
+    # float() also accepts nan and inf, which the grid cannot place
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'lat must be within -90..90 and lon within -180..180'}), 400
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    radius = request.args.get('radius', type=float)  # metres
+    if radius is not None and not (math.isfinite(radius) and radius > 0):
+        return jsonify({'error': 'radius must be a positive number of metres'}), 400
+
+    return jsonify([{
+        'name': name,
+        'longitude': s_lon,
+        'latitude': s_lat,
+        'distance_m': round(distance, 1)
+    } for distance, name, s_lat, s_lon in stop_index.nearest(lat, lon, k, radius)])
+
+# Cheapest fare between two stops, served from the in-memory fare matrix
+@stop_bp.route('/fare', methods=['GET'])
+def get_fare():
+    from_stop = request.args.get('from')
+    to_stop = request.args.get('to')
+    if not from_stop or not to_stop:
+        return jsonify({'error': 'from and to are required'}), 400
+
+    price = fare_engine.fare(from_stop, to_stop)
+    if price is None:
+        return jsonify({'error': 'No connection between these stops'}), 404
+    return jsonify({'from': from_stop, 'to': to_stop, 'price': float(price)})
+
+# List connections between stops
+@stop_bp.route('/connections', methods=['GET'])
+@read_only
+def get_connections():
+    connections = StopConnection.query.all()
+    return jsonify([{
+        'from_stop': c.from_stop,
+        'to_stop': c.to_stop,
+        'price': float(c.price) if c.price is not None else None
+    } for c in connections])
+
+# Create or re-price a connection
+@stop_bp.route('/connections', methods=['POST'])
+def create_connection():
+    data = request.json or {}
+    from_stop = data.get('from_stop')
+    to_stop = data.get('to_stop')
+    price = data.get('price')
+    if not from_stop or not to_stop or price is None:
+        return jsonify({'error': 'from_stop, to_stop and price are required'}), 400
+
+    Stop.query.get_or_404(from_stop)
+    Stop.query.get_or_404(to_stop)
+    connection = StopConnection.query.get((from_stop, to_stop))
+    if connection:
+        connection.price = price
+    else:
+        connection = StopConnection(from_stop=from_stop, to_stop=to_stop, price=price)
+        db.session.add(connection)
+    db.session.commit()
+    response_cache.bump('stops')
+    fare_engine.set_connection(from_stop, to_stop, connection.price)
+    router.invalidate()
+    return jsonify({'message': 'Connection saved'}), 201
+
+# Delete a connection
+@stop_bp.route('/connections/<string:from_stop>/<string:to_stop>', methods=['DELETE'])
+def delete_connection(from_stop, to_stop):
+    connection = StopConnection.query.get_or_404((from_stop, to_stop))
+    db.session.delete(connection)
+    db.session.commit()
+    response_cache.bump('stops')
+    fare_engine.remove_connection(from_stop, to_stop)
+    router.invalidate()
+    return jsonify({'message': 'Connection deleted'})
+
 # Get a single stop by name
 @stop_bp.route('/<string:name>', methods=['GET'])
+@read_only
 def get_stop(name):
     stop = Stop.query.get_or_404(name)
     return jsonify({
@@ -35,6 +128,10 @@ def create_stop():
     )
     db.session.add(new_stop)
     db.session.commit()
+    response_cache.bump('stops')
+    fare_engine.add_stop(new_stop.name)
+    stop_index.upsert(new_stop.name, new_stop.latitude, new_stop.longitude)
+    router.invalidate()
     return jsonify({'message': 'Stop created'}), 201
 
 # Update an existing stop
@@ -45,6 +142,11 @@ def update_stop(name):
     stop.longitude = data.get('longitude', stop.longitude)
     stop.latitude = data.get('latitude', stop.latitude)
     db.session.commit()
+    response_cache.bump('stops')
+    router.invalidate()
+    shape_store.invalidate()
+    map_matcher.invalidate()
+    stop_index.upsert(stop.name, stop.latitude, stop.longitude)
     return jsonify({'message': 'Stop updated'})
 
 # Delete a stop
@@ -53,9 +155,19 @@ def delete_stop(name):
     stop = Stop.query.get_or_404(name)
     db.session.delete(stop)
     db.session.commit()
+    response_cache.bump('stops')
+    fare_engine.remove_stop(name)
+    stop_index.remove(name)
+    router.invalidate()
+    shape_store.invalidate()
+    map_matcher.invalidate()
+    trip_search.invalidate()
+    occupancy.invalidate()
     return jsonify({'message': 'Stop deleted'})
 
 @stop_bp.route('/trip/<int:trip_id>', methods=['GET'])
+@response_cache.cached('stops', 'trips')
+@read_only
 def get_stops_for_trip(trip_id):
     """
     Return the stops for a given trip, ordered by the stop_order
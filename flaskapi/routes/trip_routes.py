@@ -1,33 +1,104 @@
-from flask import Blueprint, request, jsonify
-from db_config import db
-from models.models import Trip, Bus, Driver  # Ensure these models exist
+from flask import Blueprint, Response, request, jsonify, current_app
+from db_config import db, read_only
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from models.models import Trip, Bus, Driver, Employee  # Ensure these models exist
+from utils.pagination import parse_limit, encode_cursor, decode_cursor, paginated_response
+from utils.ndjson import wants_ndjson, ndjson_response
+from services.shapes import shape_store
+from services.etas import eta_estimator
+from services.positions import position_hub
+from services.map_matching import map_matcher
+from services.trip_search import trip_search
+from utils.response_cache import response_cache
+from utils.datetimes import parse_date_time, format_date_time
+from utils.tokens import request_token
+from datetime import datetime
 
 trip_bp = Blueprint('trip', __name__)
 
 @trip_bp.route('/', methods=['GET'])
+@read_only
 def get_trips():
-    trips = Trip.query.all()
-    trips_data = []
-    
-    for trip in trips:
-        driver_data = {
-            'email': trip.driver.email if trip.driver else None,
-            'driver_license': trip.driver.driver_license if trip.driver else None,
-            'name': trip.driver.user.name if trip.driver and trip.driver.user else None,
-        }
-
-        # Ensure the trip_id is inside the trip_data dictionary
-        trip_data = {
-            'trip_id': trip.trip_id,  # Make sure trip_id is inside the dictionary
-            'date_time': trip.date_time,
-            'current_capacity': trip.current_capacity,
-            'bus_license_plate': trip.bus_license_plate,
-            'bus_model': trip.bus.model if trip.bus else None,
-            'driver': driver_data,  # Adding the driver data inside the trip dictionary
-        }
-        trips_data.append(trip_data)
-    
-    return jsonify(trips_data)
+    """
+    List trips ordered by (date_time, trip_id), one page at a time.
+
+    Query params:
+      limit  - page size (default 50, max 500)
+      cursor - the X-Next-Cursor value returned with the previous page
+      format - 'ndjson' streams every trip instead of one page
+    """
+    # Driver -> Employee -> User and Bus are all many-to-one, so they are
+    # joined into the same SELECT instead of being lazily loaded per trip.
+    query = (
+        Trip.query
+        .options(
+            joinedload(Trip.driver)
+                .joinedload(Driver.employee)
+                .joinedload(Employee.user),
+            joinedload(Trip.bus),
+        )
+        .order_by(Trip.date_time, Trip.trip_id)
+    )
+
+    # Full export, streamed row by row; limit and cursor do not apply
+    if wants_ndjson(request.args):
+        return ndjson_response(query, _trip_to_dict)
+
+    limit = parse_limit(request.args)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            last_date_time, last_trip_id = decode_cursor(cursor)
+            if last_date_time is not None:
+                last_date_time = parse_date_time(last_date_time)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if last_date_time is None:
+            # MySQL and SQLite sort NULL first: the rest of the undated trips,
+            # then every dated one (comparing with NULL would match nothing)
+            query = query.filter(or_(
+                and_(Trip.date_time.is_(None), Trip.trip_id > last_trip_id),
+                Trip.date_time.isnot(None),
+            ))
+        else:
+            query = query.filter(or_(
+                Trip.date_time > last_date_time,
+                and_(Trip.date_time == last_date_time, Trip.trip_id > last_trip_id),
+            ))
+
+    # Fetch one extra row to know whether there is a next page
+    trips = query.limit(limit + 1).all()
+    has_more = len(trips) > limit
+    trips = trips[:limit]
+
+    trips_data = [_trip_to_dict(trip) for trip in trips]
+
+    next_cursor = None
+    if has_more:
+        last = trips[-1]
+        next_cursor = encode_cursor([last.date_time.isoformat() if last.date_time else None, last.trip_id])
+
+    return paginated_response(trips_data, next_cursor)
+
+
+def _trip_to_dict(trip):
+    driver = trip.driver
+    driver_user = driver.employee.user if driver and driver.employee else None
+    driver_data = {
+        'email': driver.email if driver else None,
+        'driver_license': driver.driver_license if driver else None,
+        'name': driver_user.name if driver_user else None,
+    }
+
+    return {
+        'trip_id': trip.trip_id,
+        'date_time': format_date_time(trip.date_time),
+        'current_capacity': trip.current_capacity,
+        'bus_license_plate': trip.bus_license_plate,
+        'bus_model': trip.bus.model if trip.bus else None,
+        'driver': driver_data,
+    }
 
 
 
@@ -40,6 +111,11 @@ def create_trip():
     if not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
     
+    try:
+        date_time = parse_date_time(data['date_time'])
+    except ValueError:
+        return jsonify({'error': 'date_time must be an ISO 8601 date and time'}), 400
+
     try:
         # Check if bus exists
         bus = Bus.query.get(data['bus_license_plate'])
@@ -54,7 +130,7 @@ def create_trip():
         # Create new trip
         new_trip = Trip(
             trip_id=data['trip_id'],
-            date_time=data['date_time'],
+            date_time=date_time,
             current_capacity=data['current_capacity'],
             bus_license_plate=data['bus_license_plate'],
             driver=data['driver']
@@ -62,6 +138,8 @@ def create_trip():
         
         db.session.add(new_trip)
         db.session.commit()
+        response_cache.bump('trips')
+        trip_search.invalidate()
         
         return jsonify({
             'message': 'Trip created successfully',
@@ -72,8 +150,43 @@ def create_trip():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@trip_bp.route('/search', methods=['GET'])
+def search_trips():
+    """
+    Trips that stop at `from` and later at `to`, earliest departure first.
+
+    Query params:
+      from, to      - stop names (required)
+      after, before - ISO 8601 bounds on the trip's departure (optional)
+      limit         - max results (default 50, max 500)
+    """
+    from_stop = request.args.get('from')
+    to_stop = request.args.get('to')
+    if not from_stop or not to_stop:
+        return jsonify({'error': 'from and to are required'}), 400
+
+    try:
+        after = parse_date_time(request.args['after']) if request.args.get('after') else None
+        before = parse_date_time(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({'error': 'after and before must be ISO 8601 dates and times'}), 400
+
+    matches = trip_search.search(from_stop, to_stop, after, before, parse_limit(request.args))
+    return jsonify([{
+        'trip_id': trip_id,
+        'date_time': format_date_time(date_time),
+        'from_order': from_order,
+        'to_order': to_order,
+    } for date_time, trip_id, from_order, to_order in matches])
+
 @trip_bp.route('/<int:trip_id>', methods=['GET'])
+@response_cache.cached('stops', 'trips', lambda trip_id: ('trip', trip_id))
+@read_only
 def get_trip(trip_id):
+    """
+    A trip with its driver and stops. The body only changes with the trip
+    itself, so it is cached; live progress comes from GET /<id>/positions.
+    """
     trip = Trip.query.get(trip_id)
     if not trip:
         return jsonify({'error': 'Trip not found'}), 404
@@ -93,7 +206,7 @@ def get_trip(trip_id):
 
     trip_data = {
         'trip_id':           trip.trip_id,
-        'date_time':         trip.date_time,
+        'date_time':         format_date_time(trip.date_time),
         'current_capacity':  trip.current_capacity,
         'bus_license_plate': trip.bus_license_plate,
         'driver': {
@@ -101,8 +214,152 @@ def get_trip(trip_id):
           'driver_license': trip.driver.driver_license if trip.driver else None,
           'name':           getattr(trip.driver.user, 'name', None)
         },
-        'stops': stops_data
+        'stops': stops_data,
     }
 
     return jsonify(trip_data)
 
+
+@trip_bp.route('/<int:trip_id>/shape', methods=['GET'])
+def get_trip_shape(trip_id):
+    """
+    Route geometry of a trip as an encoded polyline (precision 5) through
+    its stops in order. Supports If-None-Match, so clients that already
+    hold the current shape get an empty 304.
+    """
+    shape = shape_store.get(trip_id)
+    if shape is None:
+        return jsonify({'error': 'Trip not found or has no stops'}), 404
+
+    if request.if_none_match.contains_weak(shape['etag']):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({k: v for k, v in shape.items() if k != 'etag'})
+    response.set_etag(shape['etag'])
+    return response
+
+
+def _require_trip_driver(trip_id):
+    """
+    None when the request carries the session token of the trip's driver,
+    otherwise the error response (401 no driver token, 404, 403 other driver).
+    """
+    session = request_token()
+    if not session or session.get('role') != 'driver':
+        return jsonify({'error': 'Driver session token required'}), 401
+    driver_email = position_hub.driver_for(trip_id)
+    if driver_email is None and not db.session.query(Trip.trip_id).filter_by(trip_id=trip_id).first():
+        return jsonify({'error': 'Trip not found'}), 404
+    if session['email'] != driver_email:
+        return jsonify({'error': 'Driver is not assigned to this trip'}), 403
+    return None
+
+
+@trip_bp.route('/<int:trip_id>/arrivals', methods=['POST'])
+def record_arrival(trip_id):
+    """
+    A bus reached one of the trip's stops, reported by the trip's driver
+    (Authorization: Bearer session token). Body: {"stop": ..., "arrived_at":
+    ISO-8601, optional, naive values taken as UTC}. Consecutive arrivals
+    feed the segment travel times.
+    """
+    error = _require_trip_driver(trip_id)
+    if error:
+        return error
+
+    data = request.get_json() or {}
+    stop_name = data.get('stop')
+    if not stop_name:
+        return jsonify({'error': 'Missing stop'}), 400
+
+    arrived_at = None
+    if data.get('arrived_at'):
+        try:
+            arrived_at = parse_date_time(data['arrived_at'], utc=True)
+        except ValueError:
+            return jsonify({'error': 'Invalid arrived_at'}), 400
+
+    try:
+        seconds = eta_estimator.record_arrival(trip_id, stop_name, arrived_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'message': 'Arrival recorded', 'segment_seconds': seconds}), 201
+
+
+@trip_bp.route('/<int:trip_id>/etas', methods=['GET'])
+def get_trip_etas(trip_id):
+    """
+    ETAs for every remaining stop of a trip in one response, from rolling
+    percentiles of the recorded segment travel times.
+
+    Query params:
+      from       - stop the bus is at (default: last reported arrival)
+      percentile - 0..100, default 50
+    """
+    percentile = request.args.get('percentile', 50, type=float)
+    if not 0 <= percentile <= 100:
+        return jsonify({'error': 'percentile must be between 0 and 100'}), 400
+
+    try:
+        result = eta_estimator.etas(trip_id, request.args.get('from'), percentile)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if result is None:
+        return jsonify({'error': 'Trip not found or has no stops'}), 404
+
+    from_stop, etas = result
+    return jsonify({
+        'trip_id': trip_id,
+        'from_stop': from_stop,
+        'percentile': percentile,
+        'etas': etas,
+    })
+
+
+@trip_bp.route('/<int:trip_id>/positions', methods=['POST'])
+def push_position(trip_id):
+    """
+    Live position from the driver's device, authorized by the driver's
+    session token (Authorization: Bearer, from login). Body: {"latitude",
+    "longitude", "recorded_at" (ISO-8601, optional, naive values taken as
+    UTC)}. Only memory is touched here; positions reach BUS_POSITION through
+    the background flusher.
+    """
+    error = _require_trip_driver(trip_id)
+    if error:
+        return error
+
+    data = request.get_json() or {}
+    try:
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'latitude and longitude are required'}), 400
+    try:
+        recorded_at = (parse_date_time(data['recorded_at'], utc=True)
+                       if data.get('recorded_at') else datetime.utcnow())
+    except ValueError:
+        return jsonify({'error': 'Invalid recorded_at'}), 400
+
+    progress = map_matcher.progress(trip_id, latitude, longitude)
+    position_hub.start_flusher(current_app._get_current_object())
+    position = position_hub.publish(trip_id, latitude, longitude, recorded_at, progress)
+    return jsonify(position), 202
+
+
+@trip_bp.route('/<int:trip_id>/positions', methods=['GET'])
+def get_positions(trip_id):
+    """Most recent positions of a trip from memory, oldest first."""
+    limit = request.args.get('limit', type=int)
+    return jsonify(position_hub.recent(trip_id, limit))
+
+
+@trip_bp.route('/<int:trip_id>/positions/stream', methods=['GET'])
+def stream_positions(trip_id):
+    """Server-Sent Events: one `data:` message per position update."""
+    return Response(
+        position_hub.stream(trip_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
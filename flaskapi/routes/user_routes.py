@@ -1,7 +1,9 @@
-import bcrypt
 from flask import Blueprint, request, jsonify
 from models.models import User, Customer, Employee, Support, Driver, CustomerTrip, db
 from db_config import db
+from services import customer_stats
+from services.passwords import password_hasher, PasswordPoolBusy
+from utils.tokens import issue_token, read_token, request_token
 
 user_bp = Blueprint('user', __name__)
 
@@ -17,13 +19,16 @@ def register():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'message': 'Email already registered'}), 400
 
-    hashed_pw = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
+    try:
+        hashed_pw = password_hasher.hash(data['password'])
+    except PasswordPoolBusy:
+        return jsonify({'message': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
 
     new_user = User(
         email=data['email'],
         name=data['name'],
         sname=data['sname'],
-        password=hashed_pw.decode('utf-8'),
+        password=hashed_pw,
         phone=data['phone'],
     )
     
@@ -34,35 +39,42 @@ def register():
     )
     
     db.session.add(new_customer)
+    customer_stats.open_account(data['email'])
 
     db.session.commit()
     return jsonify({'message': 'Customer registered successfully'}), 201
 
-@user_bp.route('/login', methods=['POST'])
-def login():
-    data = request.get_json()
-    email = data.get('email')
-    password = data.get('password')
-
-    # Verify credentials against User table
-    user = User.query.filter_by(email=email).first()
-
-    if not user or not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
-        return jsonify({'message': 'Invalid credentials'}), 401
+def _user_with_role(email):
+    """
+    Load a user and resolve their role in one query by outer-joining the
+    role tables. Returns (user, role) or (None, None).
+    """
+    row = (
+        db.session.query(User, Driver.email, Support.email, Employee.email)
+        .outerjoin(Employee, Employee.email == User.email)
+        .outerjoin(Driver, Driver.email == User.email)
+        .outerjoin(Support, Support.email == User.email)
+        .filter(User.email == email)
+        .first()
+    )
+    if row is None:
+        return None, None
 
-    # Determine user role by checking which role-specific table they exist in
+    user, driver_email, support_email, employee_email = row
     role = 'customer'  # Default role
-    
-    if Driver.query.filter_by(email=email).first():
+    if driver_email:
         role = 'driver'
-    elif Support.query.filter_by(email=email).first():
+    elif support_email:
         role = 'support'
-    elif Employee.query.filter_by(email=email).first():
+    elif employee_email:
         role = 'employee'
-    # Customer check is not needed since it's the default
+    return user, role
 
+
+def _session_response(user, role, message):
     return jsonify({
-        'message': 'Login successful',
+        'message': message,
+        'token': issue_token(user.email, role),
         'user': {
             'email': user.email,
             'name': user.name,        # From User table
@@ -73,6 +85,43 @@ def login():
     }), 200
 
 
+@user_bp.route('/login', methods=['POST'])
+def login():
+    data = request.get_json() or {}
+    email = data.get('email')
+    password = data.get('password')
+
+    # Verify credentials against User table, role comes from the same query
+    user, role = _user_with_role(email)
+
+    try:
+        valid = user is not None and password_hasher.check(password, user.password)
+    except PasswordPoolBusy:
+        return jsonify({'message': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
+    if not valid:
+        return jsonify({'message': 'Invalid credentials'}), 401
+
+    return _session_response(user, role, 'Login successful')
+
+
+@user_bp.route('/session', methods=['POST'])
+def resume_session():
+    """
+    Exchange a token from an earlier login for fresh user data and a new
+    token, so an app start needs no password and no bcrypt work.
+    """
+    data = request.get_json(silent=True) or {}
+    payload = read_token(data['token']) if data.get('token') else request_token()
+    if not payload:
+        return jsonify({'message': 'Invalid or expired token'}), 401
+
+    user, role = _user_with_role(payload['email'])
+    if user is None:
+        return jsonify({'message': 'Invalid or expired token'}), 401
+
+    return _session_response(user, role, 'Session resumed')
+
+
 #Bunu dbde çalıştırmamız gerekiyor
 #ALTER TABLE CUSTOMER_TRIP CHANGE customer customer_email VARCHAR(255);
 @user_bp.route('/customer-trips', methods=['GET'])
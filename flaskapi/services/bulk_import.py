@@ -0,0 +1,285 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from db_config import db
+from models.models import Stop, StopConnection, Trip, Includes, Bus, Driver
+from services.fares import fare_engine
+from services.routing import router
+from services.shapes import shape_store
+from services.map_matching import map_matcher
+from services.stop_index import stop_index
+from services.trip_search import trip_search
+from services.occupancy import occupancy
+from services.positions import position_hub
+from utils.response_cache import response_cache
+from utils.datetimes import parse_date_time
+
+CHUNK_SIZE = 1000
+
+
+class ImportValidationError(Exception):
+    """Raised with the list of row errors when a batch does not validate."""
+
+    def __init__(self, errors, kind=None):
+        super().__init__('%d invalid rows' % len(errors))
+        self.errors = errors
+        self.kind = kind
+
+
+def _text(value):
+    value = (value or '').strip() if isinstance(value, str) else value
+    if value in (None, ''):
+        raise ValueError('is required')
+    return str(value)
+
+
+def _optional(convert):
+    """Wrap a converter so that a missing value becomes None (nullable column)."""
+    def wrapped(value):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        return convert(value)
+    return wrapped
+
+
+def _int(value):
+    # JSON numbers such as 3.0 arrive as floats
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    value = _text(value)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('is not an integer')
+
+
+def _float(value):
+    value = _text(value)
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError('is not a number')
+
+
+def _date_time(value):
+    return parse_date_time(_text(value))
+
+
+def _money(value):
+    try:
+        return Decimal(_text(value))
+    except InvalidOperation:
+        raise ValueError('is not a number')
+
+
+# kind -> model, columns {column: (converter, accepted input names)},
+# primary key columns, foreign keys {column: key set name} and other column
+# groups that must not repeat (checked here only, the table has no constraint)
+SPECS = {
+    'stops': {
+        'model': Stop,
+        'columns': {
+            'name': (_text, ('name', 'stop')),
+            'longitude': (_float, ('longitude', 'lon')),
+            'latitude': (_float, ('latitude', 'lat')),
+        },
+        'key': ('name',),
+        'references': {},
+    },
+    'connections': {
+        'model': StopConnection,
+        'columns': {
+            'from_stop': (_text, ('from_stop', 'from')),
+            'to_stop': (_text, ('to_stop', 'to')),
+            'price': (_money, ('price',)),
+        },
+        'key': ('from_stop', 'to_stop'),
+        'references': {'from_stop': 'stops', 'to_stop': 'stops'},
+    },
+    'trips': {
+        'model': Trip,
+        'columns': {
+            'trip_id': (_int, ('trip_id',)),
+            'date_time': (_date_time, ('date_time',)),
+            'current_capacity': (_int, ('current_capacity',)),
+            'bus_license_plate': (_optional(_text), ('bus_license_plate', 'bus')),
+            'driver_email': (_optional(_text), ('driver_email', 'driver')),
+        },
+        'key': ('trip_id',),
+        'references': {'bus_license_plate': 'buses', 'driver_email': 'drivers'},
+    },
+    'includes': {
+        'model': Includes,
+        'columns': {
+            'trip_id': (_int, ('trip_id',)),
+            'name': (_text, ('name', 'stop')),
+            'stop_order': (_int, ('stop_order', 'order')),
+        },
+        'key': ('trip_id', 'name'),
+        'references': {'trip_id': 'trips', 'name': 'stops'},
+        'unique': (('trip_id', 'stop_order'),),
+    },
+}
+
+# key set name -> column queried to preload it
+KEY_SETS = {
+    'stops': Stop.name,
+    'trips': Trip.trip_id,
+    'buses': Bus.license_plate,
+    'drivers': Driver.email,
+}
+
+
+def parse(data, fmt):
+    """Rows (list of dicts) from CSV text or a JSON array."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(data)))
+    if fmt == 'json':
+        rows = json.loads(data)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError('JSON input must be an array of objects')
+        return rows
+    raise ValueError('Unknown format %r' % fmt)
+
+
+def _preload(spec):
+    """
+    Existing primary keys of the target table, existing values of each
+    unique column group, and every referenced key set.
+    """
+    model = spec['model']
+    key_columns = [getattr(model, c) for c in spec['key']]
+    existing = {tuple(row) for row in db.session.query(*key_columns)}
+    taken = {
+        columns: {tuple(row) for row in db.session.query(*[getattr(model, c) for c in columns])}
+        for columns in spec.get('unique', ())
+    }
+    key_sets = {}
+    for name in set(spec['references'].values()):
+        column = KEY_SETS[name]
+        key_sets[name] = {value for (value,) in db.session.query(column)}
+    return existing, taken, key_sets
+
+
+def validate(kind, rows, skip_existing=False, pending=None):
+    """
+    Convert and check every row in memory. Returns (records, skipped) or
+    raises ImportValidationError listing every bad row (1-based, header excluded).
+    pending {key set name: keys} counts as existing for references, for
+    rows that refer to a batch validated but not inserted yet.
+    """
+    spec = SPECS[kind]
+    existing, taken, key_sets = _preload(spec)
+    for name, keys in (pending or {}).items():
+        if name in key_sets:
+            key_sets[name] |= keys
+
+    records, errors, skipped = [], [], 0
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        record = {}
+        try:
+            for column, (convert, names) in spec['columns'].items():
+                raw = next((row[n] for n in names if n in row), None)
+                try:
+                    record[column] = convert(raw)
+                except ValueError as e:
+                    raise ValueError('%s %s' % (column, e))
+            for column, key_set in spec['references'].items():
+                if record[column] is not None and record[column] not in key_sets[key_set]:
+                    raise ValueError('%s %r does not exist' % (column, record[column]))
+            key = tuple(record[c] for c in spec['key'])
+            if key in seen:
+                raise ValueError('duplicate of an earlier row')
+            if key in existing:
+                if skip_existing:
+                    skipped += 1
+                    continue
+                raise ValueError('already exists')
+            values = {columns: tuple(record[c] for c in columns) for columns in taken}
+            for columns, value in values.items():
+                if value in taken[columns]:
+                    raise ValueError('%s %r already used' % ('/'.join(columns), value))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+            continue
+        seen.add(key)
+        for columns, value in values.items():
+            taken[columns].add(value)
+        records.append(record)
+
+    if errors:
+        raise ImportValidationError(errors)
+    return records, skipped
+
+
+def insert(kind, records, chunk_size=CHUNK_SIZE):
+    """
+    executemany INSERTs, one transaction per chunk of chunk_size rows. The
+    in-memory views are refreshed even when a chunk fails, since the chunks
+    before it are already committed.
+    """
+    table = SPECS[kind]['model'].__table__
+    try:
+        for start in range(0, len(records), chunk_size):
+            try:
+                db.session.execute(table.insert(), records[start:start + chunk_size])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+    finally:
+        _refresh(kind)
+    return len(records)
+
+
+def import_rows(kind, rows, skip_existing=False, chunk_size=CHUNK_SIZE):
+    records, skipped = validate(kind, rows, skip_existing)
+    inserted = insert(kind, records, chunk_size)
+    return {'kind': kind, 'inserted': inserted, 'skipped': skipped}
+
+
+def import_batches(batches, skip_existing=False, chunk_size=CHUNK_SIZE):
+    """
+    Import several (kind, rows) batches, e.g. stops and the trips calling at
+    them. Every batch is validated before the first insert, so a bad one
+    leaves the database untouched; later batches may refer to keys of
+    earlier ones. A failing batch raises ImportValidationError with .kind set.
+    """
+    pending, validated = {}, []
+    for kind, rows in batches:
+        try:
+            records, skipped = validate(kind, rows, skip_existing, pending)
+        except ImportValidationError as e:
+            raise ImportValidationError(e.errors, kind)
+        if kind in KEY_SETS:
+            column = SPECS[kind]['key'][0]
+            pending.setdefault(kind, set()).update(record[column] for record in records)
+        validated.append((kind, records, skipped))
+    return [
+        {'kind': kind, 'inserted': insert(kind, records, chunk_size), 'skipped': skipped}
+        for kind, records, skipped in validated
+    ]
+
+
+def _refresh(kind):
+    """Let the in-memory views of the network pick up the new rows."""
+    if kind in ('stops', 'connections'):
+        fare_engine.reload()
+        router.invalidate()
+        response_cache.bump('stops')
+    if kind == 'stops':
+        stop_index.reload()
+    if kind in ('trips', 'includes'):
+        response_cache.bump('trips')
+        trip_search.invalidate()
+        occupancy.invalidate()
+    if kind == 'trips':
+        position_hub.forget_drivers()
+    if kind == 'includes':
+        shape_store.invalidate()
+        map_matcher.invalidate()
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from db_config import db
+from models.models import CustomerTrip, CustomerStats
+
+
+def open_account(email):
+    """Add the zeroed CUSTOMER_STATS row of a new customer to the session; the caller commits."""
+    db.session.add(CustomerStats(customer=email, refunded_total=0, ride_count=0))
+
+
+def record_ride(email, refunded_credit):
+    """
+    Bump the customer's running totals inside the caller's transaction, after
+    the ride has been added to the session. The UPDATE only locks this
+    customer's own CUSTOMER_STATS row. Every customer gets a row when created
+    (and older ones from the migration); if one is still missing, it is
+    created from the rides in this transaction, this one included.
+    """
+    if _bump(email, refunded_credit):
+        return
+
+    db.session.flush()
+    stats = CustomerStats.__table__
+    rides = CustomerTrip.__table__
+    backfill = stats.insert().from_select(
+        ['customer', 'refunded_total', 'ride_count'],
+        select(
+            literal(email),
+            func.coalesce(func.sum(rides.c.refunded_credit), 0),
+            func.count(rides.c.customer_trip_id),
+        ).where(rides.c.customer == email),
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.execute(backfill)
+    except IntegrityError:
+        # A concurrent first ride created the row; its sum does not hold this
+        # uncommitted ride, so count it on top
+        _bump(email, refunded_credit)
+
+
+def _bump(email, refunded_credit):
+    stats = CustomerStats.__table__
+    return db.session.execute(
+        stats.update()
+        .where(stats.c.customer == email)
+        .values(
+            refunded_total=stats.c.refunded_total + Decimal(str(refunded_credit or 0)),
+            ride_count=stats.c.ride_count + 1,
+        )
+    ).rowcount
+
+
+def totals(email):
+    """
+    (refunded_total, ride_count) for a customer: one primary-key read. A
+    customer without a row is summed over CUSTOMER_TRIP instead; nothing is
+    written.
+    """
+    row = db.session.query(CustomerStats.refunded_total, CustomerStats.ride_count) \
+        .filter(CustomerStats.customer == email).first()
+    if row is not None:
+        return row.refunded_total, row.ride_count
+
+    refunded_total, ride_count = (
+        db.session.query(
+            func.coalesce(func.sum(CustomerTrip.refunded_credit), 0),
+            func.count(CustomerTrip.customer_trip_id),
+        )
+        .filter(CustomerTrip.customer_email == email)
+        .one()
+    )
+    return Decimal(refunded_total), ride_count
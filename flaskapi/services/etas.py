@@ -0,0 +1,186 @@
+import bisect
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import func
+
+from db_config import db
+from models.models import Stop, Includes, SegmentTime
+from services.routing import haversine_km
+
+# Travel times kept per segment; older samples roll out of the window
+WINDOW_SIZE = 200
+# Used for segments that have no recorded history yet
+DEFAULT_SPEED_KMH = 25.0
+
+
+class SegmentWindow:
+    """Last WINDOW_SIZE travel times of one segment, also kept sorted."""
+
+    def __init__(self):
+        self.samples = deque()
+        self.ordered = []
+
+    def add(self, seconds):
+        if len(self.samples) == WINDOW_SIZE:
+            oldest = self.samples.popleft()
+            del self.ordered[bisect.bisect_left(self.ordered, oldest)]
+        self.samples.append(seconds)
+        bisect.insort(self.ordered, seconds)
+
+    def percentile(self, p):
+        """Nearest-rank percentile, p in [0, 100]."""
+        if not self.ordered:
+            return None
+        rank = max(0, min(len(self.ordered) - 1, int(round(p / 100 * (len(self.ordered) - 1)))))
+        return self.ordered[rank]
+
+
+class EtaEstimator:
+    """
+    Rolling travel-time percentiles for every (from_stop, to_stop) segment.
+
+    The windows are seeded from SEGMENT_TIME on first use and then updated
+    in place by record_arrival(), so an ETA request only reads the trip's
+    stop sequence and sums in-memory percentiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._windows = {}          # (from_stop, to_stop) -> SegmentWindow
+        self._last_arrival = {}     # trip_id -> (stop name, stop_order, datetime)
+
+    def record_arrival(self, trip_id, stop_name, arrived_at=None):
+        """
+        Register that a trip reached a stop. When the previous arrival of the
+        same trip was at the stop right before it, the segment's travel time
+        is stored and folded into its window. Returns the recorded seconds,
+        or None if no segment was completed.
+        """
+        self._ensure_loaded()
+        arrived_at = arrived_at or datetime.utcnow()
+        sequence = self.stop_sequence(trip_id)
+        order = next((o for name, o, _, _ in sequence if name == stop_name), None)
+        if order is None:
+            raise ValueError('Stop is not part of this trip')
+
+        with self._lock:
+            previous = self._last_arrival.get(trip_id)
+            self._last_arrival[trip_id] = (stop_name, order, arrived_at)
+
+        if previous is None:
+            return None
+        prev_name, prev_order, prev_time = previous
+        orders = [o for _, o, _, _ in sequence]
+        position = orders.index(order)
+        if position == 0 or orders[position - 1] != prev_order:
+            return None
+
+        seconds = (arrived_at - prev_time).total_seconds()
+        if seconds <= 0:
+            return None
+
+        db.session.add(SegmentTime(
+            trip_id=trip_id,
+            from_stop=prev_name,
+            to_stop=stop_name,
+            seconds=seconds,
+            recorded_at=arrived_at,
+        ))
+        db.session.commit()
+        with self._lock:
+            self._windows.setdefault((prev_name, stop_name), SegmentWindow()).add(seconds)
+        return seconds
+
+    def last_stop(self, trip_id):
+        previous = self._last_arrival.get(trip_id)
+        return previous[0] if previous else None
+
+    def etas(self, trip_id, from_stop=None, percentile=50):
+        """
+        Cumulative ETA in seconds for every stop after from_stop (default:
+        the last stop the trip reported, else the first stop). Returns None
+        when the trip has no stops.
+        """
+        self._ensure_loaded()
+        sequence = self.stop_sequence(trip_id)
+        if not sequence:
+            return None
+
+        names = [name for name, _, _, _ in sequence]
+        from_stop = from_stop or self.last_stop(trip_id) or names[0]
+        if from_stop not in names:
+            raise ValueError('Stop is not part of this trip')
+        start = names.index(from_stop)
+
+        etas = []
+        elapsed = 0.0
+        with self._lock:
+            for (a, _, lat_a, lon_a), (b, order, lat_b, lon_b) in zip(sequence[start:], sequence[start + 1:]):
+                window = self._windows.get((a, b))
+                seconds = window.percentile(percentile) if window else None
+                samples = len(window.samples) if window else 0
+                if seconds is None:
+                    seconds = self._fallback_seconds(lat_a, lon_a, lat_b, lon_b)
+                elapsed += seconds
+                etas.append({
+                    'name': b,
+                    'order': order,
+                    'eta_seconds': round(elapsed, 1),
+                    'samples': samples,
+                })
+        return from_stop, etas
+
+    @staticmethod
+    def stop_sequence(trip_id):
+        return (
+            db.session.query(Includes.name, Includes.stop_order, Stop.latitude, Stop.longitude)
+            .join(Stop, Stop.name == Includes.name)
+            .filter(Includes.trip_id == trip_id)
+            .order_by(Includes.stop_order)
+            .all()
+        )
+
+    @staticmethod
+    def _fallback_seconds(lat_a, lon_a, lat_b, lon_b):
+        if None in (lat_a, lon_a, lat_b, lon_b):
+            return 0.0
+        return haversine_km(lat_a, lon_a, lat_b, lon_b) / DEFAULT_SPEED_KMH * 3600
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        # Only the newest WINDOW_SIZE samples of each segment can be in its
+        # window, so older rows are never read; the query runs without the lock
+        ranked = (
+            db.session.query(
+                SegmentTime.segment_time_id,
+                SegmentTime.from_stop,
+                SegmentTime.to_stop,
+                SegmentTime.seconds,
+                func.row_number().over(
+                    partition_by=(SegmentTime.from_stop, SegmentTime.to_stop),
+                    order_by=SegmentTime.segment_time_id.desc(),
+                ).label('newest'),
+            )
+            .filter(SegmentTime.seconds.isnot(None))
+            .subquery()
+        )
+        rows = (
+            db.session.query(ranked.c.from_stop, ranked.c.to_stop, ranked.c.seconds)
+            .filter(ranked.c.newest <= WINDOW_SIZE)
+            .order_by(ranked.c.segment_time_id)
+        )
+        windows = {}
+        for from_stop, to_stop, seconds in rows:
+            windows.setdefault((from_stop, to_stop), SegmentWindow()).add(seconds)
+        with self._lock:
+            if self._loaded:
+                return
+            self._windows = windows
+            self._loaded = True
+
+
+eta_estimator = EtaEstimator()
@@ -0,0 +1,229 @@
+import heapq
+import threading
+from array import array
+from decimal import Decimal
+
+from db_config import db
+from models.models import Stop, StopConnection
+
+# Flat fare charged when the connection graph has no price for a ride
+BASE_FARE = 15
+
+UNREACHABLE = -1
+
+
+def compute_fare(start_order, end_order):
+    """
+    Return (cost, refunded_credit) for a ride between two stop orders.
+    Every stop not travelled is refunded, up to the flat fare so the cost
+    never goes below zero; unknown stops pay the full fare.
+    """
+    if start_order is None or end_order is None:
+        return BASE_FARE, 0
+    refunded_credit = min(abs(end_order - start_order), BASE_FARE)
+    return BASE_FARE - refunded_credit, refunded_credit
+
+
+def _to_cents(price):
+    return int((Decimal(str(price)) * 100).to_integral_value())
+
+
+class FareEngine:
+    """
+    Cheapest-fare lookup between any two stops, built from STOP_CONNECTION.
+
+    Stops are numbered 0..n-1 and the prices of the cheapest path between
+    every pair are kept in one flat array of cents (row-major, n*n), so a
+    lookup is two dict hits and one array index. A connection is priced
+    the same in both directions unless the reverse row exists too.
+
+    The graph is read from the database once, on first use; after that the
+    stop routes keep it up to date through add_stop / remove_stop /
+    set_connection / remove_connection. Each worker process holds its own
+    copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._names = []        # index -> stop name
+        self._index = {}        # stop name -> index
+        self._edges = {}        # (from, to) -> price in cents
+        self._matrix = array('q')
+        # (index, n, matrix) published together so readers never see a
+        # matrix that does not match the index they looked names up in
+        self._snapshot = ({}, 0, self._matrix)
+
+    # ---- lookups --------------------------------------------------------
+
+    def fare(self, from_stop, to_stop):
+        """Cheapest price between two stops as a Decimal, or None."""
+        self._ensure_loaded()
+        index, n, matrix = self._snapshot
+        i = index.get(from_stop)
+        j = index.get(to_stop)
+        if i is None or j is None:
+            return None
+        cents = matrix[i * n + j]
+        if cents == UNREACHABLE:
+            return None
+        return Decimal(cents) / 100
+
+    def fare_for_ride(self, from_stop, to_stop):
+        """
+        Return (cost, refunded_credit) for a ride, or None when the two
+        stops are not connected. Whatever the ride costs below the flat
+        fare is credited back. Raises ValueError for a ride that starts and
+        ends at the same stop, which would otherwise be free and refund
+        the whole flat fare.
+        """
+        if from_stop == to_stop:
+            raise ValueError('A ride must end at a different stop than it starts')
+        price = self.fare(from_stop, to_stop)
+        if price is None:
+            return None
+        return price, max(Decimal(BASE_FARE) - price, Decimal(0))
+
+    # ---- maintenance ----------------------------------------------------
+
+    def reload(self):
+        """Drop the in-memory graph; it is read again on the next lookup."""
+        with self._lock:
+            self._loaded = False
+
+    def add_stop(self, name):
+        with self._lock:
+            if not self._loaded or name in self._index:
+                return
+            n = len(self._names)
+            matrix = array('q', [UNREACHABLE]) * ((n + 1) * (n + 1))
+            for i in range(n):
+                matrix[i * (n + 1):i * (n + 1) + n] = self._matrix[i * n:(i + 1) * n]
+            matrix[n * (n + 1) + n] = 0
+            self._names = self._names + [name]
+            self._index = dict(self._index, **{name: n})
+            self._matrix = matrix
+            self._publish()
+
+    def remove_stop(self, name):
+        with self._lock:
+            if not self._loaded or name not in self._index:
+                return
+            self._names = [s for s in self._names if s != name]
+            self._edges = {k: v for k, v in self._edges.items() if name not in k}
+            self._rebuild()
+            self._publish()
+
+    def set_connection(self, from_stop, to_stop, price):
+        with self._lock:
+            if not self._loaded:
+                return
+            cents = _to_cents(price)
+            # Before this call from -> to may have been priced by the reverse row
+            old = self._edges.get((from_stop, to_stop), self._edges.get((to_stop, from_stop)))
+            self._edges[(from_stop, to_stop)] = cents
+            new_stops = [s for s in (from_stop, to_stop) if s not in self._index]
+            if new_stops or (old is not None and cents > old):
+                # A price increase can invalidate any path, start over
+                self._names = self._names + new_stops
+                self._rebuild()
+            else:
+                self._relax_edge(from_stop, to_stop, cents)
+            self._publish()
+
+    def remove_connection(self, from_stop, to_stop):
+        with self._lock:
+            if not self._loaded:
+                return
+            if self._edges.pop((from_stop, to_stop), None) is not None:
+                self._rebuild()
+                self._publish()
+
+    # ---- internals ------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._names = [name for (name,) in db.session.query(Stop.name).order_by(Stop.name)]
+            self._edges = {
+                (from_stop, to_stop): _to_cents(price)
+                for from_stop, to_stop, price in db.session.query(
+                    StopConnection.from_stop, StopConnection.to_stop, StopConnection.price
+                )
+                if price is not None
+            }
+            self._rebuild()
+            self._publish()
+            self._loaded = True
+
+    def _publish(self):
+        self._snapshot = (self._index, len(self._names), self._matrix)
+
+    def _adjacency(self):
+        adjacency = [[] for _ in self._names]
+        index = self._index
+        for (from_stop, to_stop), cents in self._edges.items():
+            u, v = index.get(from_stop), index.get(to_stop)
+            if u is None or v is None:
+                continue
+            adjacency[u].append((v, cents))
+            if (to_stop, from_stop) not in self._edges:
+                adjacency[v].append((u, cents))
+        return adjacency
+
+    def _rebuild(self):
+        """All-pairs cheapest prices: one Dijkstra per source stop."""
+        self._index = {name: i for i, name in enumerate(self._names)}
+        n = len(self._names)
+        adjacency = self._adjacency()
+        matrix = array('q', [UNREACHABLE]) * (n * n)
+        for source in range(n):
+            dist = {source: 0}
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for v, w in adjacency[u]:
+                    nd = d + w
+                    if nd < dist.get(v, nd + 1):
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+            row = source * n
+            for v, d in dist.items():
+                matrix[row + v] = d
+        self._matrix = matrix
+
+    def _relax_edge(self, from_stop, to_stop, cents):
+        """
+        Fold one new (or cheaper) connection into the matrix in O(n^2)
+        instead of recomputing every path.
+        """
+        n = len(self._names)
+        u, v = self._index[from_stop], self._index[to_stop]
+        matrix = array('q', self._matrix)
+        directions = [(u, v)]
+        if (to_stop, from_stop) not in self._edges:
+            directions.append((v, u))
+        for a, b in directions:
+            to_a = [matrix[i * n + a] for i in range(n)]
+            from_b = matrix[b * n:(b + 1) * n]
+            for i in range(n):
+                if to_a[i] == UNREACHABLE:
+                    continue
+                base = to_a[i] + cents
+                row = i * n
+                for j in range(n):
+                    if from_b[j] == UNREACHABLE:
+                        continue
+                    candidate = base + from_b[j]
+                    current = matrix[row + j]
+                    if current == UNREACHABLE or candidate < current:
+                        matrix[row + j] = candidate
+        self._matrix = matrix
+
+
+fare_engine = FareEngine()
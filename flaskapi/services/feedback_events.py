@@ -0,0 +1,73 @@
+import json
+import queue
+import threading
+
+# Events queued per SSE subscriber before the slowest ones start dropping
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class FeedbackEvents:
+    """
+    Pushes feedback changes to support clients over Server-Sent Events.
+
+    Each subscriber listens to one agent's inbox, or to every inbox when
+    subscribed with agent None. Events are only delivered to subscribers
+    that are connected when they are published; a client that reconnects
+    reloads its first inbox page instead of replaying missed events.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}      # agent email or None -> set of queue.Queue
+
+    def publish(self, event, feedback, agents):
+        """Send `event` with the feedback dict to the inboxes of `agents`."""
+        message = 'event: %s\ndata: %s\n\n' % (event, json.dumps(feedback))
+        answered = feedback.get('response') is not None
+        with self._lock:
+            targets = set(self._subscribers.get(None, ()))
+            for agent in set(agents):
+                targets.update(self._subscribers.get(agent, ()))
+        for q in targets:
+            try:
+                q.put_nowait((answered, message))
+            except queue.Full:
+                # A stalled client must not hold up the request that published
+                pass
+
+    def subscribe(self, agent):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(agent, set()).add(q)
+        return q
+
+    def unsubscribe(self, agent, q):
+        with self._lock:
+            subscribers = self._subscribers.get(agent)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[agent]
+
+    def stream(self, agent, answered=None, heartbeat=15.0):
+        """
+        Server-Sent Events generator for one subscriber. With answered set,
+        only events about answered (True) or open (False) feedback are sent.
+        """
+        q = self.subscribe(agent)
+        try:
+            # Sent at once so clients see the stream open before any event
+            yield ': connected\n\n'
+            while True:
+                try:
+                    is_answered, message = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if answered is None or answered == is_answered:
+                    yield message
+        finally:
+            self.unsubscribe(agent, q)
+
+
+feedback_events = FeedbackEvents()
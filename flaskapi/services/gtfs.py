@@ -0,0 +1,323 @@
+import csv
+import io
+import os
+import zipfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from db_config import db
+from models.models import Stop, StopConnection, Trip, Includes
+from services.bulk_import import import_batches, ImportValidationError
+from services.etas import DEFAULT_SPEED_KMH
+from services.routing import haversine_km
+
+# Rows written between two flushes of the zip stream
+FLUSH_ROWS = 1000
+
+AGENCY_ID = 'guzelyurtcepte'
+ROUTE_ID = 'guzelyurt'
+# GTFS route_type 3 = bus
+ROUTE_TYPE = 3
+CURRENCY = 'TRY'
+
+
+class GtfsImportError(Exception):
+    """Raised when a GTFS file fails validation; carries the file name and row errors."""
+
+    def __init__(self, filename, errors):
+        super().__init__('%s: %d invalid rows' % (filename, len(errors)))
+        self.filename = filename
+        self.errors = errors
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile; whatever has been written is handed out by drain()."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _gtfs_time(seconds):
+    """HH:MM:SS; hours may run past 24 for trips that cross midnight."""
+    seconds = int(round(seconds))
+    return '%02d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def _parse_gtfs_time(value):
+    hours, minutes, seconds = (int(part) for part in value.strip().split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _agency_rows():
+    yield ('agency_id', 'agency_name', 'agency_url', 'agency_timezone')
+    yield (AGENCY_ID,
+           os.environ.get('GTFS_AGENCY_NAME', 'GuzelyurtCepte'),
+           os.environ.get('GTFS_AGENCY_URL', 'http://localhost:5000'),
+           os.environ.get('GTFS_TIMEZONE', 'Europe/Nicosia'))
+
+
+def _route_rows():
+    yield ('route_id', 'agency_id', 'route_short_name', 'route_long_name', 'route_type')
+    yield (ROUTE_ID, AGENCY_ID, 'GC', 'Guzelyurt', ROUTE_TYPE)
+
+
+def _stop_rows():
+    # Every stop is its own fare zone so fare_rules can name origin and destination
+    yield ('stop_id', 'stop_name', 'stop_lat', 'stop_lon', 'zone_id')
+    query = db.session.query(Stop.name, Stop.latitude, Stop.longitude).order_by(Stop.name)
+    for name, lat, lon in query.yield_per(FLUSH_ROWS):
+        yield (name, name, lat, lon, name)
+
+
+def _trip_rows(departures, service_dates):
+    """
+    trips.txt. Fills departures {trip_id: departure in seconds after midnight}
+    for stop_times.txt; trips without stops or without a date_time are left out.
+    """
+    yield ('route_id', 'service_id', 'trip_id')
+    query = (
+        db.session.query(Trip.trip_id, Trip.date_time)
+        .filter(db.session.query(Includes.trip_id).filter(Includes.trip_id == Trip.trip_id).exists())
+        .order_by(Trip.trip_id)
+    )
+    for trip_id, when in query.yield_per(FLUSH_ROWS):
+        if when is None:
+            continue
+        service_date = when.strftime('%Y%m%d')
+        departures[trip_id] = when.hour * 3600 + when.minute * 60 + when.second
+        service_dates.add(service_date)
+        yield (ROUTE_ID, service_date, trip_id)
+
+
+def _calendar_date_rows(service_dates):
+    # exception_type 1 = service added on that date
+    yield ('service_id', 'date', 'exception_type')
+    for service_date in sorted(service_dates):
+        yield (service_date, service_date, 1)
+
+
+def _stop_time_rows(departures):
+    """
+    stop_times.txt, one pass over INCLUDES in (trip, order) order. Only the
+    departure is scheduled; later stops get times estimated at DEFAULT_SPEED_KMH
+    and are marked timepoint=0.
+    """
+    yield ('trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence', 'timepoint')
+    query = (
+        db.session.query(Includes.trip_id, Includes.stop_order, Includes.name,
+                         Stop.latitude, Stop.longitude)
+        .join(Stop, Stop.name == Includes.name)
+        .order_by(Includes.trip_id, Includes.stop_order)
+    )
+    current, clock, previous = None, 0.0, None
+    for trip_id, stop_order, name, lat, lon in query.yield_per(FLUSH_ROWS):
+        if trip_id not in departures:
+            continue
+        if trip_id != current:
+            current, clock, previous = trip_id, float(departures[trip_id]), None
+            timepoint = 1
+        else:
+            clock += haversine_km(previous[0], previous[1], lat, lon) / DEFAULT_SPEED_KMH * 3600
+            timepoint = 0
+        previous = (lat, lon)
+        time = _gtfs_time(clock)
+        yield (trip_id, time, time, name, stop_order, timepoint)
+
+
+def _fare_rows(rules):
+    """fare_attributes.txt; one fare per connection, collected into rules for fare_rules.txt."""
+    yield ('fare_id', 'price', 'currency_type', 'payment_method', 'transfers')
+    query = (
+        db.session.query(StopConnection.from_stop, StopConnection.to_stop, StopConnection.price)
+        .order_by(StopConnection.from_stop, StopConnection.to_stop)
+    )
+    for number, (from_stop, to_stop, price) in enumerate(query.yield_per(FLUSH_ROWS), start=1):
+        fare_id = 'F%d' % number
+        rules.append((fare_id, from_stop, to_stop))
+        # payment_method 0 = paid on board, transfers 0 = none allowed
+        yield (fare_id, price, CURRENCY, 0, 0)
+
+
+def _fare_rule_rows(rules):
+    yield ('fare_id', 'route_id', 'origin_id', 'destination_id')
+    for fare_id, origin, destination in rules:
+        yield (fare_id, ROUTE_ID, origin, destination)
+
+
+def export_feed():
+    """
+    Yield a GTFS zip as it is written. Each file is streamed straight from a
+    yield_per query and flushed every FLUSH_ROWS rows, so no table is held in
+    memory; only trip departure times and fare ids are kept between files.
+    """
+    sink = _ZipStream()
+    departures, service_dates, rules = {}, set(), []
+    files = (
+        ('agency.txt', _agency_rows),
+        ('routes.txt', _route_rows),
+        ('stops.txt', _stop_rows),
+        ('trips.txt', lambda: _trip_rows(departures, service_dates)),
+        ('calendar_dates.txt', lambda: _calendar_date_rows(service_dates)),
+        ('stop_times.txt', lambda: _stop_time_rows(departures)),
+        ('fare_attributes.txt', lambda: _fare_rows(rules)),
+        ('fare_rules.txt', lambda: _fare_rule_rows(rules)),
+    )
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as feed:
+        for filename, rows in files:
+            with feed.open(filename, 'w', force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+                writer = csv.writer(text)
+                for number, row in enumerate(rows(), start=1):
+                    writer.writerow(row)
+                    if number % FLUSH_ROWS == 0:
+                        text.flush()
+                        yield sink.drain()
+                text.flush()
+                text.detach()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _read(feed, filename, required=True):
+    try:
+        with feed.open(filename) as entry:
+            return list(csv.DictReader(io.TextIOWrapper(entry, encoding='utf-8-sig')))
+    except KeyError:
+        if required:
+            raise GtfsImportError(filename, [{'row': 0, 'error': 'file is missing'}])
+        return []
+
+
+def _service_dates(feed):
+    """service_id -> first date it runs, from calendar_dates.txt and/or calendar.txt."""
+    dates = {}
+    for row in _read(feed, 'calendar.txt', required=False):
+        dates[row['service_id']] = row['start_date']
+    for row in _read(feed, 'calendar_dates.txt', required=False):
+        if row.get('exception_type', '1').strip() == '1':
+            service_id = row['service_id']
+            dates[service_id] = min(dates.get(service_id, row['date']), row['date'])
+    return dates
+
+
+def _trip_ids(gtfs_ids):
+    """
+    GTFS trip_id -> TRIP.trip_id. Numeric ids are kept; the others (most
+    real feeds) are numbered on from the highest id in the table or feed.
+    """
+    numeric = {}
+    for gtfs_id in gtfs_ids:
+        try:
+            numeric[gtfs_id] = int(gtfs_id)
+        except ValueError:
+            pass
+    next_id = max([db.session.query(func.max(Trip.trip_id)).scalar() or 0, *numeric.values()]) + 1
+    ids = {}
+    for gtfs_id in gtfs_ids:
+        if gtfs_id in numeric:
+            ids[gtfs_id] = numeric[gtfs_id]
+        else:
+            ids[gtfs_id] = next_id
+            next_id += 1
+    return ids
+
+
+def _trip_and_include_rows(feed):
+    """
+    Trip rows (date_time = service date + first departure) and include rows
+    with stop_sequence renumbered to consecutive stop orders from 1, plus
+    warnings for trips left out because no departure time can be derived.
+    """
+    stop_times = defaultdict(list)
+    for row in _read(feed, 'stop_times.txt'):
+        stop_times[row['trip_id']].append(row)
+
+    dates = _service_dates(feed)
+    rows = _read(feed, 'trips.txt')
+    trip_ids = _trip_ids([row['trip_id'] for row in rows])
+    trips, includes, warnings = [], [], []
+    for number, row in enumerate(rows, start=1):
+        gtfs_id = row['trip_id']
+        times = sorted(stop_times.get(gtfs_id, ()), key=lambda r: int(r['stop_sequence']))
+        service_date = dates.get(row.get('service_id'))
+        first = times and (times[0].get('departure_time') or times[0].get('arrival_time'))
+        if not first or not service_date:
+            reason = 'no service date' if first else 'no stop_times with a departure'
+            warnings.append({'file': 'trips.txt', 'row': number,
+                             'warning': 'trip %s skipped: %s' % (gtfs_id, reason)})
+            continue
+        day = datetime.strptime(service_date.strip(), '%Y%m%d')
+        date_time = day + timedelta(seconds=_parse_gtfs_time(first))
+        trip_id = trip_ids[gtfs_id]
+        trips.append({'trip_id': trip_id, 'date_time': date_time, 'current_capacity': 0})
+        for order, stop_time in enumerate(times, start=1):
+            includes.append({'trip_id': trip_id, 'name': stop_time['stop_id'], 'stop_order': order})
+    return trips, includes, warnings
+
+
+def _connection_rows(feed, zones):
+    prices = {row['fare_id']: row['price'] for row in _read(feed, 'fare_attributes.txt', required=False)}
+    rows = []
+    for rule in _read(feed, 'fare_rules.txt', required=False):
+        origin, destination = rule.get('origin_id'), rule.get('destination_id')
+        if not origin or not destination or rule['fare_id'] not in prices:
+            continue
+        for from_stop in zones.get(origin, ()):
+            for to_stop in zones.get(destination, ()):
+                rows.append({'from_stop': from_stop, 'to_stop': to_stop,
+                             'price': prices[rule['fare_id']]})
+    return rows
+
+
+def import_feed(data, skip_existing=False):
+    """
+    Load a GTFS zip (bytes or file object) through the bulk importer: stops,
+    fares as connections, trips and their stop sequences. Every file is
+    parsed and validated before the first insert, so a bad feed changes
+    nothing. Returns {'imported': per-kind results, 'warnings': skipped trips}.
+
+    Non-numeric trip ids get new integer ids, so importing such a feed twice
+    adds its trips twice even with skip_existing.
+    """
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    with zipfile.ZipFile(data) as feed:
+        try:
+            stops = _read(feed, 'stops.txt')
+            zones = defaultdict(list)
+            for row in stops:
+                zones[row.get('zone_id') or row['stop_id']].append(row['stop_id'])
+            stop_rows = [{'name': row['stop_id'], 'latitude': row.get('stop_lat'),
+                          'longitude': row.get('stop_lon')} for row in stops]
+            connection_rows = _connection_rows(feed, zones)
+            trip_rows, include_rows, warnings = _trip_and_include_rows(feed)
+        except KeyError as e:
+            raise GtfsImportError('feed', [{'row': 0, 'error': 'missing column %s' % e}])
+        except ValueError as e:
+            raise GtfsImportError('feed', [{'row': 0, 'error': str(e)}])
+
+    filenames = {'stops': 'stops.txt', 'connections': 'fare_rules.txt',
+                 'trips': 'trips.txt', 'includes': 'stop_times.txt'}
+    try:
+        results = import_batches((('stops', stop_rows),
+                                  ('connections', connection_rows),
+                                  ('trips', trip_rows),
+                                  ('includes', include_rows)),
+                                 skip_existing=skip_existing)
+    except ImportValidationError as e:
+        raise GtfsImportError(filenames[e.kind], e.errors)
+    return {'imported': results, 'warnings': warnings}
@@ -0,0 +1,65 @@
+import threading
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from db_config import db
+from models.models import IdBlock, CustomerTrip
+
+BLOCK_SIZE = 100
+
+
+class BlockIdAllocator:
+    """
+    Hands out primary keys from ranges reserved in ID_BLOCK.
+
+    Each process reserves BLOCK_SIZE ids at a time with a single UPDATE on
+    its ID_BLOCK row, in its own short transaction, and then serves them
+    from memory. Concurrent writers never get the same id and most inserts
+    cost no extra query. Ids left in a block when a process exits are
+    skipped, so ids are unique but not gapless.
+    """
+
+    def __init__(self, name, column, block_size=BLOCK_SIZE):
+        self.name = name
+        self.column = column
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve()
+            value = self._next
+            self._next += 1
+            return value
+
+    def _reserve(self):
+        table = IdBlock.__table__
+        for _ in range(3):
+            try:
+                with db.engine.begin() as conn:
+                    updated = conn.execute(
+                        table.update()
+                        .where(table.c.name == self.name)
+                        .values(next_value=table.c.next_value + self.block_size)
+                    ).rowcount
+                    if updated:
+                        end = conn.execute(
+                            select(table.c.next_value).where(table.c.name == self.name)
+                        ).scalar()
+                        return end - self.block_size, end
+
+                    # First block ever: continue after the ids already in use
+                    start = (conn.execute(select(func.max(self.column))).scalar() or 0) + 1
+                    conn.execute(table.insert().values(name=self.name, next_value=start + self.block_size))
+                    return start, start + self.block_size
+            except IntegrityError:
+                # Another process created the row first, reserve from it
+                continue
+        raise RuntimeError('Could not reserve an id block for %s' % self.name)
+
+
+customer_trip_ids = BlockIdAllocator('CUSTOMER_TRIP', CustomerTrip.customer_trip_id)
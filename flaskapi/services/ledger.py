@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from db_config import db
+from models.models import Customer, BalanceLedger, BalanceSnapshot
+
+TOPUP = 'topup'
+FARE = 'fare'
+REFUND = 'refund'
+ADJUSTMENT = 'adjustment'
+
+# Fold a customer's ledger into the snapshot once this many rows pile up
+COMPACT_THRESHOLD = 50
+# Rows younger than this are left out of a snapshot so that transactions
+# still in flight (and holding a lower entry_id) are not skipped
+COMPACT_GRACE = timedelta(seconds=60)
+
+
+class BalanceLedgerService:
+    """
+    Customer balances as an append-only ledger on top of a snapshot.
+
+    Every top-up, fare and refund is one INSERT into BALANCE_LEDGER, so a
+    boarding never locks or rewrites a shared row. A balance is the
+    snapshot (balance up to last_entry_id) plus the sum of the newer rows.
+    Snapshots are cached in memory and compacted forward once enough rows
+    accumulate. Compaction also refreshes CUSTOMER.balance for readers
+    that still use the column.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}    # email -> (balance, last_entry_id)
+
+    def post(self, email, amount, kind, customer_trip_id=None):
+        """Add a ledger row to the current session; the caller commits."""
+        entry = BalanceLedger(
+            customer=email,
+            amount=Decimal(str(amount)),
+            kind=kind,
+            customer_trip_id=customer_trip_id,
+            created_at=datetime.utcnow(),
+        )
+        db.session.add(entry)
+        return entry
+
+    def balance(self, email):
+        """Current balance as a Decimal."""
+        base, last_entry_id = self._snapshot(email)
+        pending, count = (
+            db.session.query(func.sum(BalanceLedger.amount), func.count(BalanceLedger.entry_id))
+            .filter(BalanceLedger.customer == email, BalanceLedger.entry_id > last_entry_id)
+            .one()
+        )
+        if count >= COMPACT_THRESHOLD:
+            try:
+                self.compact(email)
+            except SQLAlchemyError:
+                # Only an optimisation; the next read tries again
+                pass
+        return Decimal(base) + Decimal(pending or 0)
+
+    @staticmethod
+    def balance_expression():
+        """
+        The same balance as a SQL expression, for a query that selects from
+        CUSTOMER and outer-joins BALANCE_SNAPSHOT on the customer.
+        """
+        pending = (
+            db.session.query(func.coalesce(func.sum(BalanceLedger.amount), 0))
+            .filter(BalanceLedger.customer == Customer.email,
+                    BalanceLedger.entry_id > func.coalesce(BalanceSnapshot.last_entry_id, 0))
+            .correlate(Customer, BalanceSnapshot)
+            .scalar_subquery()
+        )
+        return func.coalesce(BalanceSnapshot.balance, Customer.balance, 0) + pending
+
+    def compact(self, email):
+        """
+        Move the snapshot forward to the newest row older than COMPACT_GRACE,
+        folding in every row up to it whatever its created_at (clocks of
+        different app servers may disagree). Runs in its own session, so the
+        caller's transaction is left alone. Safe to run concurrently: the
+        snapshot row is only updated if its watermark is still the one this
+        call started from.
+        """
+        base, last_entry_id = self._snapshot(email)
+        cutoff = datetime.utcnow() - COMPACT_GRACE
+        with Session(db.engine) as session:
+            new_last_id = (
+                session.query(func.max(BalanceLedger.entry_id))
+                .filter(BalanceLedger.customer == email,
+                        BalanceLedger.entry_id > last_entry_id,
+                        BalanceLedger.created_at <= cutoff)
+                .scalar()
+            )
+            if new_last_id is None:
+                return False
+            amount = (
+                session.query(func.sum(BalanceLedger.amount))
+                .filter(BalanceLedger.customer == email,
+                        BalanceLedger.entry_id > last_entry_id,
+                        BalanceLedger.entry_id <= new_last_id)
+                .scalar()
+            )
+
+            new_balance = Decimal(base) + Decimal(amount or 0)
+            now = datetime.utcnow()
+            try:
+                snapshots = BalanceSnapshot.__table__
+                updated = session.execute(
+                    snapshots.update()
+                    .where(snapshots.c.customer == email, snapshots.c.last_entry_id == last_entry_id)
+                    .values(balance=new_balance, last_entry_id=new_last_id, compacted_at=now)
+                ).rowcount
+                if not updated and last_entry_id:
+                    # Someone else moved the snapshot; re-read it next time
+                    session.rollback()
+                    self.forget(email)
+                    return False
+                if not updated:
+                    session.add(BalanceSnapshot(
+                        customer=email, balance=new_balance,
+                        last_entry_id=new_last_id, compacted_at=now,
+                    ))
+                session.query(Customer).filter_by(email=email).update({'balance': new_balance})
+                session.commit()
+            except IntegrityError:
+                # Someone else created the first snapshot at the same time
+                session.rollback()
+                self.forget(email)
+                return False
+
+        with self._lock:
+            self._snapshots[email] = (new_balance, new_last_id)
+        return True
+
+    def compact_all(self):
+        """Compact every customer that has rows past its snapshot."""
+        emails = [email for (email,) in db.session.query(BalanceLedger.customer).distinct()]
+        return sum(1 for email in emails if self.compact(email))
+
+    def forget(self, email):
+        with self._lock:
+            self._snapshots.pop(email, None)
+
+    def _snapshot(self, email):
+        with self._lock:
+            cached = self._snapshots.get(email)
+        if cached is not None:
+            return cached
+
+        snapshot = BalanceSnapshot.query.get(email)
+        if snapshot is not None:
+            cached = (snapshot.balance, snapshot.last_entry_id)
+        else:
+            # Never compacted: CUSTOMER.balance is the opening balance
+            opening = db.session.query(Customer.balance).filter_by(email=email).scalar()
+            cached = (opening or Decimal(0), 0)
+        with self._lock:
+            self._snapshots[email] = cached
+        return cached
+
+
+ledger = BalanceLedgerService()
@@ -0,0 +1,178 @@
+import bisect
+import math
+import threading
+
+from db_config import db
+from models.models import Stop, Includes
+
+EARTH_RADIUS_M = 6371000.0
+# Side of one spatial-index cell, in metres
+CELL_SIZE_M = 250.0
+# How many rings of neighbouring cells to search before giving up
+MAX_RINGS = 8
+
+
+class TripLine:
+    """
+    A trip's stop sequence as a polyline in local planar metres.
+
+    cumulative[i] is the distance along the route from the first stop to
+    stop i, and every segment (stop i -> stop i + 1) is registered in the
+    grid cells its bounding box touches, so a snap only measures the few
+    segments around the point instead of the whole route.
+    """
+
+    def __init__(self, stops):
+        # stops: [(name, stop_order, latitude, longitude)] in route order
+        self.names = [s[0] for s in stops]
+        self.orders = [s[1] for s in stops]
+        self.lat0 = sum(s[2] for s in stops) / len(stops)
+        self.lon0 = sum(s[3] for s in stops) / len(stops)
+        self._cos_lat0 = math.cos(math.radians(self.lat0))
+        self.points = [self._project(s[2], s[3]) for s in stops]
+
+        self.cumulative = [0.0]
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:]):
+            self.cumulative.append(self.cumulative[-1] + math.hypot(x2 - x1, y2 - y1))
+
+        self.cells = {}
+        for i, ((x1, y1), (x2, y2)) in enumerate(zip(self.points, self.points[1:])):
+            for cx in range(self._cell(min(x1, x2)), self._cell(max(x1, x2)) + 1):
+                for cy in range(self._cell(min(y1, y2)), self._cell(max(y1, y2)) + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    @property
+    def length(self):
+        return self.cumulative[-1]
+
+    def _project(self, lat, lon):
+        x = math.radians(lon - self.lon0) * EARTH_RADIUS_M * self._cos_lat0
+        y = math.radians(lat - self.lat0) * EARTH_RADIUS_M
+        return x, y
+
+    def _unproject(self, x, y):
+        lat = self.lat0 + math.degrees(y / EARTH_RADIUS_M)
+        lon = self.lon0 + math.degrees(x / (EARTH_RADIUS_M * self._cos_lat0))
+        return lat, lon
+
+    @staticmethod
+    def _cell(value):
+        return int(math.floor(value / CELL_SIZE_M))
+
+    def _ring(self, cx, cy, ring):
+        """Segments registered in the cells exactly `ring` cells away."""
+        found = set()
+        for i in range(cx - ring, cx + ring + 1):
+            for j in range(cy - ring, cy + ring + 1):
+                if max(abs(i - cx), abs(j - cy)) == ring:
+                    found.update(self.cells.get((i, j), ()))
+        return found
+
+    def _measure(self, i, x, y):
+        (x1, y1), (x2, y2) = self.points[i], self.points[i + 1]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length_sq))
+        offset = math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+        return offset, self.cumulative[i] + t * math.sqrt(length_sq)
+
+    def snap(self, lat, lon):
+        """Return (distance along route, offset from route) in metres."""
+        x, y = self._project(lat, lon)
+        if len(self.points) == 1:
+            return 0.0, math.hypot(x - self.points[0][0], y - self.points[0][1])
+
+        cx, cy = self._cell(x), self._cell(y)
+        best = None
+        seen = set()
+        for ring in range(MAX_RINGS + 1):
+            for i in self._ring(cx, cy, ring) - seen:
+                seen.add(i)
+                measured = self._measure(i, x, y)
+                if best is None or measured[0] < best[0]:
+                    best = measured
+            # Every cell outside this ring is at least ring * CELL_SIZE_M away
+            if best is not None and best[0] <= ring * CELL_SIZE_M:
+                break
+        else:
+            # Far from the route: measure whatever the rings did not reach
+            for i in range(len(self.points) - 1):
+                if i not in seen:
+                    measured = self._measure(i, x, y)
+                    if best is None or measured[0] < best[0]:
+                        best = measured
+
+        offset, along = best
+        return along, offset
+
+    def locate(self, along):
+        """Index of the stop at or before `along` metres, by binary search."""
+        i = bisect.bisect_right(self.cumulative, along) - 1
+        return max(0, min(i, len(self.points) - 2))
+
+    def progress(self, lat, lon):
+        along, offset = self.snap(lat, lon)
+        if len(self.points) == 1:
+            i, fraction = 0, 0.0
+            next_i = 0
+        else:
+            i = self.locate(along)
+            next_i = i + 1
+            segment = self.cumulative[next_i] - self.cumulative[i]
+            fraction = (along - self.cumulative[i]) / segment if segment else 0.0
+
+        (x1, y1), (x2, y2) = self.points[i], self.points[next_i]
+        snapped = self._unproject(x1 + fraction * (x2 - x1), y1 + fraction * (y2 - y1))
+        return {
+            'previous_stop': self.names[i],
+            'previous_order': self.orders[i],
+            'next_stop': self.names[next_i],
+            'next_order': self.orders[next_i],
+            'fraction': round(fraction, 4),
+            'distance_along_m': round(along, 1),
+            'route_length_m': round(self.length, 1),
+            'offset_m': round(offset, 1),
+            'snapped_latitude': snapped[0],
+            'snapped_longitude': snapped[1],
+        }
+
+
+class MapMatcher:
+    """Snaps live positions onto trips; one cached TripLine per trip."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lines = {}    # trip_id -> TripLine, or None if it has no stops
+
+    def progress(self, trip_id, lat, lon):
+        """Progress dict for a position on a trip, or None without stops."""
+        line = self._line(trip_id)
+        return line.progress(lat, lon) if line else None
+
+    def invalidate(self, trip_id=None):
+        with self._lock:
+            if trip_id is None:
+                self._lines.clear()
+            else:
+                self._lines.pop(trip_id, None)
+
+    def _line(self, trip_id):
+        with self._lock:
+            if trip_id in self._lines:
+                return self._lines[trip_id]
+
+        stops = (
+            db.session.query(Includes.name, Includes.stop_order, Stop.latitude, Stop.longitude)
+            .join(Stop, Stop.name == Includes.name)
+            .filter(Includes.trip_id == trip_id)
+            .filter(Stop.latitude.isnot(None), Stop.longitude.isnot(None))
+            .order_by(Includes.stop_order)
+            .all()
+        )
+        line = TripLine(stops) if stops else None
+        with self._lock:
+            self._lines[trip_id] = line
+        return line
+
+
+map_matcher = MapMatcher()
@@ -0,0 +1,153 @@
+import threading
+
+from db_config import db
+from models.models import Trip, Bus, Includes, CustomerTrip
+
+_NOTHING = float('-inf')
+
+
+class SegmentLoad:
+    """
+    Riders on each segment of one trip (segment i runs from the i-th stop to
+    the next). Segment tree with lazy range add: adding a ride over a range of
+    segments and asking for the peak load of a range are both O(log n).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._max = [0] * (4 * max(size, 1))
+        self._add = [0] * (4 * max(size, 1))
+
+    def add(self, lo, hi, value):
+        """Add value to segments lo..hi inclusive."""
+        if self.size and lo <= hi:
+            self._update(lo, hi, value, 1, 0, self.size - 1)
+
+    def peak(self, lo=0, hi=None):
+        """Highest load over segments lo..hi inclusive (the whole trip by default)."""
+        hi = self.size - 1 if hi is None else hi
+        if not self.size or lo > hi:
+            return 0
+        return self._query(lo, hi, 1, 0, self.size - 1)
+
+    def _update(self, lo, hi, value, node, left, right):
+        if hi < left or right < lo:
+            return
+        if lo <= left and right <= hi:
+            self._max[node] += value
+            self._add[node] += value
+            return
+        mid = (left + right) // 2
+        self._update(lo, hi, value, 2 * node, left, mid)
+        self._update(lo, hi, value, 2 * node + 1, mid + 1, right)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._add[node]
+
+    def _query(self, lo, hi, node, left, right):
+        if hi < left or right < lo:
+            return _NOTHING
+        if lo <= left and right <= hi:
+            return self._max[node]
+        mid = (left + right) // 2
+        return max(self._query(lo, hi, 2 * node, left, mid),
+                   self._query(lo, hi, 2 * node + 1, mid + 1, right)) + self._add[node]
+
+
+class _TripLayout:
+    def __init__(self, positions, capacity):
+        self.positions = positions      # stop name -> index in stop order
+        self.capacity = capacity        # None = no limit known
+
+    def segments(self, start, end):
+        """Segment range ridden from start to end, or None if not a forward ride on this trip."""
+        first, last = self.positions.get(start), self.positions.get(end)
+        if first is None or last is None or first >= last:
+            return None
+        return first, last - 1
+
+
+class OccupancyTracker:
+    """
+    Seats taken on every segment of a trip, counted from its CUSTOMER_TRIP rows.
+
+    Only a trip's stop order and bus capacity are cached, read outside the
+    lock the first time the trip is boarded. The rides themselves are read on
+    every boarding, inside the transaction that saves the new ride and after
+    locking the trip's row, so boardings of one trip are serialized across all
+    worker processes and each one sees every ride committed before it. A ride
+    that is rolled back never held a seat, so there is nothing to give back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._layouts = {}  # trip_id -> _TripLayout
+
+    def invalidate(self, trip_id=None):
+        """Forget one trip's stops and capacity (or all); read again on the next boarding."""
+        with self._lock:
+            if trip_id is None:
+                self._layouts.clear()
+            else:
+                self._layouts.pop(trip_id, None)
+
+    def board(self, trip_id, start, end):
+        """
+        Check that every segment from start to end has a free seat.
+        Returns (accepted, peak load over the ride before boarding, capacity).
+        Raises ValueError if the trip does not serve start before end; trips
+        without stops are not tracked and always accept.
+
+        Call it in the transaction that then adds the CUSTOMER_TRIP row: the
+        trip's row stays locked until that transaction commits or rolls back.
+        """
+        layout = self._layout(trip_id)
+        if not layout.positions:
+            return True, 0, layout.capacity
+        segments = layout.segments(start, end)
+        if segments is None:
+            raise ValueError('Trip %s does not go from %s to %s' % (trip_id, start, end))
+        db.session.query(Trip.trip_id).filter(Trip.trip_id == trip_id).with_for_update().scalar()
+        peak = self._load(trip_id, layout).peak(*segments)
+        if layout.capacity is not None and peak >= layout.capacity:
+            return False, peak, layout.capacity
+        return True, peak, layout.capacity
+
+    def peak(self, trip_id):
+        """Most seats taken on any segment of the trip, as the current transaction sees it."""
+        return self._load(trip_id, self._layout(trip_id)).peak()
+
+    def _layout(self, trip_id):
+        with self._lock:
+            layout = self._layouts.get(trip_id)
+        if layout is not None:
+            return layout
+        stops = (
+            db.session.query(Includes.name)
+            .filter(Includes.trip_id == trip_id, Includes.stop_order.isnot(None))
+            .order_by(Includes.stop_order)
+            .all()
+        )
+        capacity = (
+            db.session.query(Bus.capacity)
+            .join(Trip, Trip.bus_license_plate == Bus.license_plate)
+            .filter(Trip.trip_id == trip_id)
+            .scalar()
+        )
+        layout = _TripLayout({name: i for i, (name,) in enumerate(stops)}, capacity)
+        with self._lock:
+            return self._layouts.setdefault(trip_id, layout)
+
+    @staticmethod
+    def _load(trip_id, layout):
+        load = SegmentLoad(max(len(layout.positions) - 1, 0))
+        rides = (
+            db.session.query(CustomerTrip.start_position, CustomerTrip.end_position)
+            .filter(CustomerTrip.trip_id == trip_id)
+        )
+        for start, end in rides:
+            segments = layout.segments(start, end)
+            if segments:
+                load.add(segments[0], segments[1], 1)
+        return load
+
+
+occupancy = OccupancyTracker()
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+# bcrypt cost factor for new hashes (bcrypt's own default is 12)
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+# Worker processes doing bcrypt, and how many requests may wait on them
+POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', os.cpu_count() or 2))
+MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', POOL_SIZE * 4))
+# How long a request waits for a slot before it is turned away
+ACQUIRE_TIMEOUT = 2.0
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hash/verify jobs queued; the caller should answer 503."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small process pool so that login storms use the pool's
+    cores instead of blocking every request thread. At most MAX_PENDING
+    jobs are admitted at a time; beyond that callers get PasswordPoolBusy
+    rather than an ever-growing queue. Workers are spawned, not forked: the
+    server process has threads and open database connections a fork
+    would copy in whatever state they are in.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, max_pending=MAX_PENDING):
+        self._pool_size = pool_size
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def hash(self, password):
+        return self._run(_hash, password.encode('utf-8'), BCRYPT_ROUNDS).decode('utf-8')
+
+    def check(self, password, hashed):
+        if not password or not hashed:
+            return False
+        try:
+            return self._run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+        except ValueError:
+            # Not a bcrypt hash (e.g. a legacy plain-text password)
+            return False
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=ACQUIRE_TIMEOUT):
+            raise PasswordPoolBusy()
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._pool_size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,198 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from db_config import db
+from models.models import BusPosition, Trip
+
+# Positions kept in memory per trip
+BUFFER_SIZE = 256
+# Updates queued per SSE subscriber before the slowest ones start dropping
+SUBSCRIBER_QUEUE_SIZE = 64
+# How often buffered positions are written to BUS_POSITION, and in what chunks
+FLUSH_INTERVAL = 5.0
+FLUSH_BATCH = 1000
+# Positions waiting for the flusher; beyond this the oldest are dropped,
+# so an unreachable database cannot grow memory without bound
+MAX_PENDING = 50000
+
+
+class RingBuffer:
+    """Fixed-size buffer; once full, each append overwrites the oldest item."""
+
+    def __init__(self, capacity=BUFFER_SIZE):
+        self._items = [None] * capacity
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def latest(self):
+        if not self._count:
+            return None
+        return self._items[(self._next - 1) % self._capacity]
+
+    def items(self, limit=None):
+        """Oldest first, at most `limit` of the newest items."""
+        count = self._count if limit is None else min(limit, self._count)
+        start = self._next - count
+        return [self._items[(start + i) % self._capacity] for i in range(count)]
+
+
+class PositionHub:
+    """
+    Live bus positions per trip.
+
+    publish() only touches memory: it appends to the trip's ring buffer,
+    hands the update to every subscriber queue and queues it for the
+    background flusher, which writes BUS_POSITION rows in bulk every
+    FLUSH_INTERVAL seconds. At most MAX_PENDING positions wait for it;
+    older ones are dropped and counted in `dropped`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}          # trip_id -> RingBuffer
+        self._subscribers = {}      # trip_id -> set of queue.Queue
+        self._pending = deque(maxlen=MAX_PENDING)
+        self.dropped = 0            # positions never written to BUS_POSITION
+        self._flusher = None
+        self._drivers = {}          # trip_id -> driver email
+
+    def publish(self, trip_id, latitude, longitude, recorded_at, progress=None):
+        position = {
+            'trip_id': trip_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'recorded_at': recorded_at.isoformat(),
+            'progress': progress,
+        }
+        with self._lock:
+            buffer = self._buffers.get(trip_id)
+            if buffer is None:
+                buffer = self._buffers[trip_id] = RingBuffer()
+            buffer.append(position)
+            subscribers = list(self._subscribers.get(trip_id, ()))
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append((trip_id, latitude, longitude, recorded_at))
+
+        for q in subscribers:
+            try:
+                q.put_nowait(position)
+            except queue.Full:
+                # A stalled client must not hold up the driver's device
+                pass
+        return position
+
+    def driver_for(self, trip_id):
+        """Driver email of a trip, read once and then served from memory until forget_drivers()."""
+        if trip_id not in self._drivers:
+            trip = Trip.query.get(trip_id)
+            if trip is None:
+                return None
+            self._drivers[trip_id] = trip.driver_email
+        return self._drivers[trip_id]
+
+    def forget_drivers(self):
+        """Drop the cached trip drivers after trips were added or changed."""
+        with self._lock:
+            self._drivers = {}
+
+    def latest(self, trip_id):
+        with self._lock:
+            buffer = self._buffers.get(trip_id)
+            return buffer.latest() if buffer else None
+
+    def recent(self, trip_id, limit=None):
+        with self._lock:
+            buffer = self._buffers.get(trip_id)
+            return buffer.items(limit) if buffer else []
+
+    def subscribe(self, trip_id):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(trip_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, trip_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(trip_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[trip_id]
+
+    def stream(self, trip_id, heartbeat=15.0):
+        """Server-Sent Events generator for one subscriber."""
+        q = self.subscribe(trip_id)
+        try:
+            latest = self.latest(trip_id)
+            if latest is not None:
+                yield 'data: %s\n\n' % json.dumps(latest)
+            while True:
+                try:
+                    position = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield 'data: %s\n\n' % json.dumps(position)
+        finally:
+            self.unsubscribe(trip_id, q)
+
+    # ---- persistence ----------------------------------------------------
+
+    def start_flusher(self, app):
+        """Start the background writer once per process."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, args=(app,), daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self, app):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    db.session.rollback()
+                    print("Error while flushing bus positions (%d dropped so far):" % self.dropped, e)
+
+    def flush(self):
+        """Write queued positions to BUS_POSITION, FLUSH_BATCH rows per commit."""
+        written = 0
+        while self._pending:
+            batch = []
+            with self._lock:
+                while self._pending and len(batch) < FLUSH_BATCH:
+                    batch.append(self._pending.popleft())
+            try:
+                db.session.execute(BusPosition.__table__.insert(), [{
+                    'trip_id': trip_id,
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'recorded_at': recorded_at,
+                } for trip_id, latitude, longitude, recorded_at in batch])
+                db.session.commit()
+            except Exception:
+                # Keep the rows for the next attempt, as far as they still fit;
+                # positions queued meanwhile are newer and win
+                with self._lock:
+                    room = self._pending.maxlen - len(self._pending)
+                    kept = batch[len(batch) - room:] if room < len(batch) else batch
+                    self.dropped += len(batch) - len(kept)
+                    self._pending.extendleft(reversed(kept))
+                raise
+            written += len(batch)
+        return written
+
+
+position_hub = PositionHub()
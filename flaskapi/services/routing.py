@@ -0,0 +1,223 @@
+import heapq
+import math
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+from db_config import db
+from models.models import Stop, StopConnection
+from services.fares import _to_cents
+
+EARTH_RADIUS_KM = 6371.0
+CACHE_SIZE = 1024
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class StopGraph:
+    """
+    STOP_CONNECTION as a compressed sparse row (CSR) adjacency.
+
+    The neighbours of stop i are targets[offsets[i]:offsets[i + 1]] and the
+    matching prices (in cents) are in weights at the same positions. Like
+    the fare engine, a connection can be travelled both ways unless the
+    reverse row exists with its own price.
+    """
+
+    def __init__(self, names, latitudes, longitudes, edges):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.latitudes = array('d', latitudes)
+        self.longitudes = array('d', longitudes)
+
+        n = len(names)
+        buckets = [[] for _ in range(n)]
+        for (from_stop, to_stop), cents in edges.items():
+            u, v = self.index.get(from_stop), self.index.get(to_stop)
+            if u is None or v is None:
+                continue
+            buckets[u].append((v, cents))
+            if (to_stop, from_stop) not in edges:
+                buckets[v].append((u, cents))
+
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self.weights = array('q')
+        for bucket in buckets:
+            for v, cents in sorted(bucket):
+                self.targets.append(v)
+                self.weights.append(cents)
+            self.offsets.append(len(self.targets))
+
+        # Cheapest price per km over all connections. Scaled by the
+        # straight-line distance it never overestimates the remaining
+        # price, so A* stays exact.
+        self.cents_per_km = self._min_cents_per_km()
+
+    def _has_coords(self, i):
+        return not (math.isnan(self.latitudes[i]) or math.isnan(self.longitudes[i]))
+
+    def _distance(self, i, j):
+        return haversine_km(self.latitudes[i], self.longitudes[i],
+                            self.latitudes[j], self.longitudes[j])
+
+    def _min_cents_per_km(self):
+        if not all(self._has_coords(i) for i in range(len(self.names))):
+            return 0.0
+        ratio = None
+        for u in range(len(self.names)):
+            for k in range(self.offsets[u], self.offsets[u + 1]):
+                distance = self._distance(u, self.targets[k])
+                if distance == 0:
+                    return 0.0
+                candidate = self.weights[k] / distance
+                if ratio is None or candidate < ratio:
+                    ratio = candidate
+        return ratio or 0.0
+
+    def cheapest_path(self, source, target):
+        """A* on price. Returns (path, cents) or None."""
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        ratio = self.cents_per_km
+
+        def heuristic(i):
+            return self._distance(i, target) * ratio if ratio else 0.0
+
+        best = {source: 0}
+        previous = {}
+        heap = [(heuristic(source), 0, source)]
+        while heap:
+            _, cost, u = heapq.heappop(heap)
+            if u == target:
+                return self._unwind(previous, target), cost
+            if cost > best[u]:
+                continue
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                new_cost = cost + weights[k]
+                if v not in best or new_cost < best[v]:
+                    best[v] = new_cost
+                    previous[v] = u
+                    heapq.heappush(heap, (new_cost + heuristic(v), new_cost, v))
+        return None
+
+    def fewest_hops_path(self, source, target):
+        """Breadth-first search. Returns (path, cents) or None."""
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        previous = {source: None}
+        price = {source: 0}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            if u == target:
+                return self._unwind(previous, target), price[target]
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if v not in previous:
+                    previous[v] = u
+                    price[v] = price[u] + weights[k]
+                    queue.append(v)
+        return None
+
+    @staticmethod
+    def _unwind(previous, target):
+        path = [target]
+        while previous.get(path[-1]) is not None:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path
+
+
+class Router:
+    """
+    Answers route queries from an in-memory StopGraph and keeps the last
+    CACHE_SIZE answers in an LRU keyed by (from, to). The graph is loaded
+    on first use and dropped by invalidate() whenever stops or connections
+    change.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._graph = None
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def invalidate(self):
+        with self._lock:
+            self._graph = None
+            self._cache.clear()
+
+    def route(self, from_stop, to_stop):
+        """
+        Return {'cheapest': ..., 'fewest_hops': ...} for two stop names, or
+        None if either stop is unknown. A leg is None when no path exists.
+        """
+        key = (from_stop, to_stop)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        graph = self._get_graph()
+        source, target = graph.index.get(from_stop), graph.index.get(to_stop)
+        if source is None or target is None:
+            return None
+
+        result = {
+            'cheapest': self._describe(graph, graph.cheapest_path(source, target)),
+            'fewest_hops': self._describe(graph, graph.fewest_hops_path(source, target)),
+        }
+
+        with self._lock:
+            if self._graph is graph:
+                self._cache[key] = result
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def _get_graph(self):
+        with self._lock:
+            if self._graph is None:
+                self._graph = self._load()
+            return self._graph
+
+    @staticmethod
+    def _load():
+        stops = db.session.query(Stop.name, Stop.latitude, Stop.longitude).order_by(Stop.name).all()
+        edges = {
+            (from_stop, to_stop): _to_cents(price)
+            for from_stop, to_stop, price in db.session.query(
+                StopConnection.from_stop, StopConnection.to_stop, StopConnection.price
+            )
+            if price is not None
+        }
+        return StopGraph(
+            [name for name, _, _ in stops],
+            [lat if lat is not None else math.nan for _, lat, _ in stops],
+            [lon if lon is not None else math.nan for _, _, lon in stops],
+            edges,
+        )
+
+    @staticmethod
+    def _describe(graph, found):
+        if found is None:
+            return None
+        path, cents = found
+        return {
+            'stops': [{
+                'name': graph.names[i],
+                'latitude': None if math.isnan(graph.latitudes[i]) else graph.latitudes[i],
+                'longitude': None if math.isnan(graph.longitudes[i]) else graph.longitudes[i],
+            } for i in path],
+            'price': cents / 100,
+            'hops': len(path) - 1,
+        }
+
+
+router = Router()
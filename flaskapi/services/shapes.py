@@ -0,0 +1,74 @@
+import hashlib
+import threading
+
+from db_config import db
+from models.models import Stop, Includes
+from utils import polyline
+
+
+class ShapeStore:
+    """
+    One encoded polyline per trip, built from its stops in INCLUDES order.
+
+    Shapes are built on first request and kept until invalidate() is called
+    for the trip (or for every trip, when a stop moves or disappears), so
+    repeat requests cost neither a query nor an encode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = {}    # trip_id -> shape dict
+
+    def get(self, trip_id):
+        """Shape dict for a trip, or None if the trip has no located stops."""
+        with self._lock:
+            shape = self._shapes.get(trip_id)
+        if shape is not None:
+            return shape
+
+        shape = self._build(trip_id)
+        if shape is not None:
+            with self._lock:
+                self._shapes[trip_id] = shape
+        return shape
+
+    def invalidate(self, trip_id=None):
+        with self._lock:
+            if trip_id is None:
+                self._shapes.clear()
+            else:
+                self._shapes.pop(trip_id, None)
+
+    @staticmethod
+    def _build(trip_id):
+        rows = (
+            db.session.query(Stop.latitude, Stop.longitude)
+            .join(Includes, Includes.name == Stop.name)
+            .filter(Includes.trip_id == trip_id)
+            .filter(Stop.latitude.isnot(None), Stop.longitude.isnot(None))
+            .order_by(Includes.stop_order)
+            .all()
+        )
+        if not rows:
+            return None
+
+        points = [(lat, lon) for lat, lon in rows]
+        encoded = polyline.encode(points)
+        lats = [lat for lat, _ in points]
+        lons = [lon for _, lon in points]
+        return {
+            'trip_id': trip_id,
+            'polyline': encoded,
+            'precision': 5,
+            'point_count': len(points),
+            'bounds': {
+                'min_latitude': min(lats),
+                'min_longitude': min(lons),
+                'max_latitude': max(lats),
+                'max_longitude': max(lons),
+            },
+            'etag': hashlib.sha1(encoded.encode('ascii')).hexdigest(),
+        }
+
+
+shape_store = ShapeStore()
@@ -0,0 +1,131 @@
+import heapq
+import math
+import threading
+
+from db_config import db
+from models.models import Stop
+from services.routing import haversine_km
+
+# Side of one grid cell in degrees (about 1.1 km of latitude)
+CELL_DEG = 0.01
+METRES_PER_DEG = 111195.0
+# Rings searched before falling back to a scan of every stop
+MAX_RINGS = 50
+
+
+class StopIndex:
+    """
+    Stops bucketed into a lat/lon grid for nearest-stop queries.
+
+    A query walks rings of cells outward from the rider and stops as soon
+    as no unvisited cell can hold anything closer than what was found, so
+    it only measures the stops around the rider. The create/update/delete
+    stop routes move single entries in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._cells = {}        # (i, j) -> {name: (lat, lon)}
+        self._positions = {}    # name -> (lat, lon)
+
+    def upsert(self, name, lat, lon):
+        with self._lock:
+            if self._loaded:
+                self._remove(name)
+                self._insert(name, lat, lon)
+
+    def remove(self, name):
+        with self._lock:
+            if self._loaded:
+                self._remove(name)
+
+    def reload(self):
+        """Drop the index; it is read again on the next query."""
+        with self._lock:
+            self._loaded = False
+            self._cells = {}
+            self._positions = {}
+
+    def nearest(self, lat, lon, k=5, radius_m=None):
+        """Up to k stops as (distance_m, name, lat, lon), closest first."""
+        self._ensure_loaded()
+        with self._lock:
+            ci, cj = self._cell(lat, lon)
+            best = []      # max-heap of (-distance, name, lat, lon)
+            visited = 0
+            for ring in range(MAX_RINGS + 1):
+                for cell in self._ring(ci, cj, ring):
+                    for name, (s_lat, s_lon) in self._cells.get(cell, {}).items():
+                        visited += 1
+                        self._offer(best, k, radius_m, lat, lon, name, s_lat, s_lon)
+                # Nothing outside the rings seen so far is closer than this
+                bound = ring * CELL_DEG * METRES_PER_DEG * math.cos(
+                    math.radians(min(89.0, abs(lat) + (ring + 1) * CELL_DEG)))
+                if radius_m is not None and bound > radius_m:
+                    break
+                if len(best) == k and -best[0][0] <= bound:
+                    break
+                if visited == len(self._positions):
+                    break
+            else:
+                best = []
+                for name, (s_lat, s_lon) in self._positions.items():
+                    self._offer(best, k, radius_m, lat, lon, name, s_lat, s_lon)
+
+        return sorted((-d, name, s_lat, s_lon) for d, name, s_lat, s_lon in best)
+
+    @staticmethod
+    def _offer(best, k, radius_m, lat, lon, name, s_lat, s_lon):
+        distance = haversine_km(lat, lon, s_lat, s_lon) * 1000
+        if radius_m is not None and distance > radius_m:
+            return
+        if len(best) < k:
+            heapq.heappush(best, (-distance, name, s_lat, s_lon))
+        elif distance < -best[0][0]:
+            heapq.heapreplace(best, (-distance, name, s_lat, s_lon))
+
+    @staticmethod
+    def _cell(lat, lon):
+        return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+    @staticmethod
+    def _ring(ci, cj, ring):
+        if ring == 0:
+            return [(ci, cj)]
+        cells = []
+        for d in range(-ring, ring + 1):
+            cells.extend([(ci - ring, cj + d), (ci + ring, cj + d)])
+        for d in range(-ring + 1, ring):
+            cells.extend([(ci + d, cj - ring), (ci + d, cj + ring)])
+        return cells
+
+    def _insert(self, name, lat, lon):
+        if lat is None or lon is None:
+            return
+        self._positions[name] = (lat, lon)
+        self._cells.setdefault(self._cell(lat, lon), {})[name] = (lat, lon)
+
+    def _remove(self, name):
+        position = self._positions.pop(name, None)
+        if position is None:
+            return
+        cell = self._cell(*position)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(name, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for name, lat, lon in db.session.query(Stop.name, Stop.latitude, Stop.longitude):
+                self._insert(name, lat, lon)
+            self._loaded = True
+
+
+stop_index = StopIndex()
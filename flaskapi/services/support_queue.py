@@ -0,0 +1,139 @@
+import heapq
+import threading
+
+from sqlalchemy import func
+
+from db_config import db
+from models.models import Feedback, Support
+
+# Busiest minus idlest open-ticket count that triggers moving a ticket
+REBALANCE_GAP = 2
+
+
+class SupportAssigner:
+    """
+    Hands new feedback to the support agent with the fewest open tickets
+    (feedback whose response IS NULL).
+
+    Counts are read from the database once, then kept in memory. Two heaps
+    order the agents, least loaded first and most loaded first. Entries are
+    never updated in place: a changed count pushes a fresh entry and stale
+    ones are dropped when they reach the top, so assign and close are
+    O(log n).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._open = {}     # agent email -> open tickets
+        self._least = []    # (open, email)
+        self._most = []     # (-open, email)
+
+    def reload(self):
+        """Drop the counts; they are read again on next use."""
+        with self._lock:
+            self._loaded = False
+            self._open = {}
+            self._least = []
+            self._most = []
+
+    def assign(self):
+        """Email of the least-loaded agent, now counting the new ticket; None without agents."""
+        self._ensure_loaded()
+        with self._lock:
+            email = self._top(self._least, 1)
+            if email is not None:
+                self._set(email, self._open[email] + 1)
+            return email
+
+    def close(self, email):
+        """One of email's open tickets was answered."""
+        self._ensure_loaded()
+        with self._lock:
+            if self._open.get(email, 0) > 0:
+                self._set(email, self._open[email] - 1)
+
+    def rebalance(self):
+        """
+        If the busiest agent has REBALANCE_GAP or more open tickets than the
+        idlest one, move their newest open ticket over. The change is added
+        to the session for the caller to commit; returns (moved Feedback,
+        previous agent) or None. The ticket is looked up outside the lock.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            idle, busy = self._uneven_pair()
+        if idle is None:
+            return None
+        ticket = (
+            Feedback.query
+            .filter(Feedback.support == busy, Feedback.response.is_(None))
+            .order_by(Feedback.feedback_id.desc())
+            .first()
+        )
+        with self._lock:
+            if ticket is None:
+                # Counts drifted from the table; start over from the database
+                self._loaded = False
+                return None
+            # Tickets may have been assigned or closed during the query
+            if (idle, busy) != self._uneven_pair():
+                return None
+            ticket.support = idle
+            self._set(busy, self._open[busy] - 1)
+            self._set(idle, self._open[idle] + 1)
+            return ticket, busy
+
+    def _uneven_pair(self):
+        """(idlest, busiest) agent if REBALANCE_GAP or more apart, else (None, None)."""
+        idle = self._top(self._least, 1)
+        busy = self._top(self._most, -1)
+        if idle is None or self._open[busy] - self._open[idle] < REBALANCE_GAP:
+            return None, None
+        return idle, busy
+
+    def _top(self, heap, sign):
+        while heap:
+            key, email = heap[0]
+            if email in self._open and key == sign * self._open[email]:
+                return email
+            heapq.heappop(heap)
+        return None
+
+    def _set(self, email, count):
+        self._open[email] = count
+        heapq.heappush(self._least, (count, email))
+        heapq.heappush(self._most, (-count, email))
+        # Stale entries pile up with every change; rebuild once they dominate
+        if len(self._least) > 4 * len(self._open) + 16:
+            self._least = [(n, e) for e, n in self._open.items()]
+            self._most = [(-n, e) for e, n in self._open.items()]
+            heapq.heapify(self._least)
+            heapq.heapify(self._most)
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+        # Read without the lock so assign/close on loaded counts never wait on it
+        counts = {email: 0 for (email,) in db.session.query(Support.email)}
+        rows = (
+            db.session.query(Feedback.support, func.count())
+            .filter(Feedback.response.is_(None), Feedback.support.isnot(None))
+            .group_by(Feedback.support)
+        )
+        for email, count in rows:
+            if email in counts:
+                counts[email] = count
+        with self._lock:
+            if self._loaded:
+                return
+            self._open = counts
+            self._least = [(n, e) for e, n in counts.items()]
+            self._most = [(-n, e) for e, n in counts.items()]
+            heapq.heapify(self._least)
+            heapq.heapify(self._most)
+            self._loaded = True
+
+
+support_assigner = SupportAssigner()
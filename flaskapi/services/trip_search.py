@@ -0,0 +1,89 @@
+import bisect
+import threading
+
+from db_config import db
+from models.models import Trip, Includes
+
+
+class TripSearchIndex:
+    """
+    Finds the trips that call at one stop and later at another.
+
+    Two in-memory structures, read from the database on first use:
+    an inverted index stop -> {trip_id: stop_order} from INCLUDES, and every
+    dated trip as (date_time, trip_id) sorted by departure. A search bisects
+    the departure list down to the window, then walks whichever is shorter,
+    the window or the trips serving the origin, probing the other side with
+    dict lookups. Trips without a date_time are never returned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stops = {}        # stop name -> {trip_id: stop_order}
+        self._departures = []   # sorted [(date_time, trip_id)]
+        self._dates = {}        # trip_id -> date_time
+
+    def invalidate(self):
+        """Drop the index; it is read again on the next search."""
+        with self._lock:
+            self._loaded = False
+            self._stops = {}
+            self._departures = []
+            self._dates = {}
+
+    def search(self, from_stop, to_stop, after=None, before=None, limit=None):
+        """
+        [(date_time, trip_id, from_order, to_order)] for trips that stop at
+        from_stop before to_stop and depart in [after, before], earliest first.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            origin = self._stops.get(from_stop, {})
+            destination = self._stops.get(to_stop, {})
+            lo = bisect.bisect_left(self._departures, (after,)) if after else 0
+            hi = bisect.bisect_right(self._departures, (before, float('inf'))) if before else len(self._departures)
+
+            matches = []
+            if hi - lo <= len(origin):
+                # The window is the smaller side: walk it in departure order
+                for date_time, trip_id in self._departures[lo:hi]:
+                    start = origin.get(trip_id)
+                    end = destination.get(trip_id)
+                    if start is not None and end is not None and start < end:
+                        matches.append((date_time, trip_id, start, end))
+                        if limit and len(matches) == limit:
+                            break
+            else:
+                for trip_id, start in origin.items():
+                    end = destination.get(trip_id)
+                    date_time = self._dates.get(trip_id)
+                    if end is None or start >= end or date_time is None:
+                        continue
+                    if (after and date_time < after) or (before and date_time > before):
+                        continue
+                    matches.append((date_time, trip_id, start, end))
+                matches.sort()
+                if limit:
+                    matches = matches[:limit]
+        return matches
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            stops, dates = {}, {}
+            for trip_id, date_time in db.session.query(Trip.trip_id, Trip.date_time):
+                if date_time is not None:
+                    dates[trip_id] = date_time
+            for name, trip_id, stop_order in db.session.query(
+                    Includes.name, Includes.trip_id, Includes.stop_order):
+                if stop_order is not None:
+                    stops.setdefault(name, {})[trip_id] = stop_order
+            self._stops = stops
+            self._dates = dates
+            self._departures = sorted((date_time, trip_id) for trip_id, date_time in dates.items())
+            self._loaded = True
+
+
+trip_search = TripSearchIndex()
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+from db_config import db
+from models.models import User, Employee, Driver, Stop, Trip, Includes, SegmentTime
+from services.etas import EtaEstimator, WINDOW_SIZE
+from services.positions import position_hub
+from utils.tokens import issue_token
+
+
+@pytest.fixture
+def trip(app):
+    with app.app_context():
+        db.session.add(User(email='arrivals@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Employee(email='arrivals@example.com', department='ops'))
+        db.session.add(Driver(email='arrivals@example.com', driver_license='L'))
+        db.session.add_all([Stop(name='A', latitude=35.0, longitude=33.0),
+                            Stop(name='B', latitude=35.01, longitude=33.0)])
+        db.session.add(Trip(trip_id=1, date_time=datetime(2025, 5, 1, 8, 0), current_capacity=0,
+                            driver_email='arrivals@example.com'))
+        db.session.flush()
+        db.session.add_all([Includes(trip_id=1, name='A', stop_order=1),
+                            Includes(trip_id=1, name='B', stop_order=2)])
+        db.session.commit()
+    position_hub.forget_drivers()
+    return 1
+
+
+def _headers(app, email, role='driver'):
+    with app.test_request_context():
+        return {'Authorization': 'Bearer ' + issue_token(email, role)}
+
+
+def test_arrivals_need_the_assigned_drivers_token(app, trip):
+    client = app.test_client()
+    body = {'stop': 'A'}
+    assert client.post('/api/trips/1/arrivals', json=body).status_code == 401
+    assert client.post('/api/trips/1/arrivals', json=body,
+                       headers=_headers(app, 'arrivals@example.com', 'customer')).status_code == 401
+    assert client.post('/api/trips/1/arrivals', json=body,
+                       headers=_headers(app, 'someone@example.com')).status_code == 403
+    assert client.post('/api/trips/99/arrivals', json=body,
+                       headers=_headers(app, 'arrivals@example.com')).status_code == 404
+
+
+def test_arrival_times_with_offsets_are_stored_as_utc(app, trip):
+    client = app.test_client()
+    headers = _headers(app, 'arrivals@example.com')
+    response = client.post('/api/trips/1/arrivals', headers=headers,
+                           json={'stop': 'A', 'arrived_at': '2025-05-01T08:00:00'})
+    assert response.status_code == 201
+    # 11:05+03:00 is 08:05 UTC, five minutes after the naive (UTC) arrival
+    response = client.post('/api/trips/1/arrivals', headers=headers,
+                           json={'stop': 'B', 'arrived_at': '2025-05-01T11:05:00+03:00'})
+    assert response.status_code == 201
+    assert response.get_json()['segment_seconds'] == 300
+
+    with app.app_context():
+        assert db.session.query(SegmentTime.recorded_at).scalar() == datetime(2025, 5, 1, 8, 5)
+
+
+def test_invalid_arrival_time_is_rejected(app, trip):
+    client = app.test_client()
+    response = client.post('/api/trips/1/arrivals', headers=_headers(app, 'arrivals@example.com'),
+                           json={'stop': 'A', 'arrived_at': 'yesterday'})
+    assert response.status_code == 400
+
+
+def test_windows_load_only_the_newest_samples_per_segment(app):
+    with app.app_context():
+        db.session.add_all([SegmentTime(trip_id=1, from_stop='A', to_stop='B', seconds=float(i))
+                            for i in range(WINDOW_SIZE + 50)])
+        db.session.add(SegmentTime(trip_id=1, from_stop='B', to_stop='C', seconds=60.0))
+        db.session.commit()
+
+        estimator = EtaEstimator()
+        estimator._ensure_loaded()
+        assert list(estimator._windows[('A', 'B')].samples) == [float(i) for i in range(50, WINDOW_SIZE + 50)]
+        assert list(estimator._windows[('B', 'C')].samples) == [60.0]
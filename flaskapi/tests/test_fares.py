@@ -0,0 +1,59 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from db_config import db
+from models.models import User, Customer, Stop, StopConnection, Trip, Includes
+from services.fares import BASE_FARE, compute_fare, fare_engine
+
+
+@pytest.fixture
+def network(app):
+    with app.app_context():
+        db.session.add_all([Stop(name='A', latitude=35.0, longitude=33.0),
+                            Stop(name='B', latitude=35.01, longitude=33.0)])
+        db.session.flush()
+        db.session.add(StopConnection(from_stop='A', to_stop='B', price=5))
+        db.session.add(User(email='rider@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Customer(email='rider@example.com', balance=100))
+        db.session.commit()
+    fare_engine.reload()
+
+
+def test_fare_refunds_the_rest_of_the_flat_fare(app, network):
+    with app.app_context():
+        assert fare_engine.fare_for_ride('A', 'B') == (Decimal(5), Decimal(10))
+
+
+def test_same_stop_ride_is_rejected(app, network):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            fare_engine.fare_for_ride('A', 'A')
+    response = app.test_client().post('/api/customers/rider@example.com/start-trip', json={
+        'start_position': 'A', 'end_position': 'A', 'trip_id': 1})
+    assert response.status_code == 400
+
+
+def test_long_ride_without_connection_costs_at_most_the_flat_fare(app):
+    with app.app_context():
+        names = ['S%02d' % i for i in range(20)]
+        db.session.add_all([Stop(name=name, latitude=35.0 + i / 100, longitude=33.0)
+                            for i, name in enumerate(names)])
+        db.session.add(Trip(trip_id=7, date_time=datetime(2025, 5, 1, 8, 0), current_capacity=0))
+        db.session.flush()
+        db.session.add_all([Includes(trip_id=7, name=name, stop_order=i)
+                            for i, name in enumerate(names, start=1)])
+        db.session.add(User(email='long@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Customer(email='long@example.com', balance=100))
+        db.session.commit()
+    fare_engine.reload()
+
+    assert compute_fare(1, 20) == (0, BASE_FARE)
+    client = app.test_client()
+    response = client.post('/api/customers/long@example.com/start-trip', json={
+        'start_position': 'S00', 'end_position': 'S19', 'trip_id': 7})
+    assert response.status_code == 201
+    ride = client.get('/api/customers/long@example.com/trips').get_json()[0]
+    assert (ride['cost'], ride['refunded_credit']) == (0, BASE_FARE)
+    assert client.get('/api/customers/long@example.com').get_json()['balance'] == 100
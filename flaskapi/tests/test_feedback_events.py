@@ -0,0 +1,16 @@
+from services.feedback_events import FeedbackEvents
+
+
+def test_stream_keeps_to_the_agents_inbox_and_answered_filter():
+    events = FeedbackEvents()
+    stream = events.stream('agent@example.com', answered=False, heartbeat=0.01)
+    assert next(stream) == ': connected\n\n'
+
+    events.publish('created', {'feedback_id': 1, 'response': None}, ['other@example.com'])
+    events.publish('reassigned', {'feedback_id': 2, 'response': 'done'}, ['agent@example.com'])
+    events.publish('created', {'feedback_id': 3, 'response': None}, ['agent@example.com'])
+
+    assert next(stream) == 'event: created\ndata: {"feedback_id": 3, "response": null}\n\n'
+    assert next(stream) == ': keep-alive\n\n'
+    stream.close()
+    assert events._subscribers == {}
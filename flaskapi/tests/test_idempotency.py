@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from db_config import db
+from models.models import User, Customer, Stop, Bus, Trip, Includes, CustomerTrip
+from services.occupancy import occupancy
+
+
+@pytest.fixture
+def ride(app):
+    with app.app_context():
+        db.session.add_all([Stop(name='A', latitude=35.0, longitude=33.0),
+                            Stop(name='B', latitude=35.01, longitude=33.0)])
+        db.session.add(Bus(license_plate='BUS-1', model='M', capacity=1))
+        db.session.flush()
+        db.session.add(Trip(trip_id=11, date_time=datetime(2025, 5, 1, 8, 0), current_capacity=0,
+                            bus_license_plate='BUS-1'))
+        db.session.flush()
+        db.session.add_all([Includes(trip_id=11, name='A', stop_order=1),
+                            Includes(trip_id=11, name='B', stop_order=2)])
+        db.session.add(User(email='retry@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Customer(email='retry@example.com', balance=100))
+        db.session.commit()
+    occupancy.invalidate()
+    return {'start_position': 'A', 'end_position': 'B', 'trip_id': 11}
+
+
+def test_non_string_key_is_rejected(app, ride):
+    response = app.test_client().post('/api/customers/retry@example.com/start-trip',
+                                      json={**ride, 'idempotency_key': 5})
+    assert response.status_code == 400
+
+
+def test_retry_with_the_same_key_books_once(app, ride):
+    client = app.test_client()
+    url = '/api/customers/retry@example.com/start-trip'
+    first = client.post(url, json=ride, headers={'Idempotency-Key': 'tap-1'})
+    assert first.status_code == 201
+    # the bus is full now, but the retry still gets the saved ride back
+    retry = client.post(url, json=ride, headers={'Idempotency-Key': 'tap-1'})
+    assert retry.status_code == 200
+    assert retry.get_json()['trip_id'] == first.get_json()['trip_id']
+    assert client.post(url, json=ride, headers={'Idempotency-Key': 'tap-2'}).status_code == 409
+
+    with app.app_context():
+        assert db.session.query(CustomerTrip).count() == 1
@@ -0,0 +1,25 @@
+import pytest
+
+from db_config import db
+from models.models import Stop
+from services.stop_index import stop_index
+
+
+@pytest.mark.parametrize('query', [
+    'lat=nan&lon=33', 'lat=35&lon=inf', 'lat=-inf&lon=33', 'lat=91&lon=33', 'lat=35&lon=181',
+    'lat=35&lon=33&radius=nan', 'lat=35&lon=33&radius=-5',
+])
+def test_bad_coordinates_are_rejected(app, query):
+    response = app.test_client().get('/api/stops/nearest?' + query)
+    assert response.status_code == 400
+
+
+def test_nearest_stop(app):
+    with app.app_context():
+        db.session.add_all([Stop(name='A', latitude=35.0, longitude=33.0),
+                            Stop(name='B', latitude=35.5, longitude=33.5)])
+        db.session.commit()
+    stop_index.reload()
+    response = app.test_client().get('/api/stops/nearest?lat=35.01&lon=33.0&k=1')
+    assert response.status_code == 200
+    assert [stop['name'] for stop in response.get_json()] == ['A']
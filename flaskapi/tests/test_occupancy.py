@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from db_config import db
+from models.models import User, Customer, Stop, Bus, Trip, Includes, CustomerTrip
+from services.ledger import ledger
+from services.occupancy import SegmentLoad, occupancy
+
+
+@pytest.fixture
+def bus(app):
+    """Trip 21 over A -> B -> C on a one-seat bus, and two customers."""
+    with app.app_context():
+        db.session.add_all([Stop(name=name, latitude=35.0 + i / 100, longitude=33.0)
+                            for i, name in enumerate('ABC')])
+        db.session.add(Bus(license_plate='BUS-21', model='M', capacity=1))
+        db.session.flush()
+        db.session.add(Trip(trip_id=21, date_time=datetime(2025, 5, 1, 8, 0), current_capacity=0,
+                            bus_license_plate='BUS-21'))
+        db.session.flush()
+        db.session.add_all([Includes(trip_id=21, name=name, stop_order=i + 1)
+                            for i, name in enumerate('ABC')])
+        for email in ('seat-a@example.com', 'seat-b@example.com'):
+            db.session.add(User(email=email, name='N', sname='S', password='x', phone='1'))
+            db.session.add(Customer(email=email, balance=100))
+        db.session.commit()
+    occupancy.invalidate()
+    return 21
+
+
+def _board(client, email, start, end):
+    return client.post('/api/customers/%s/start-trip' % email,
+                       json={'trip_id': 21, 'start_position': start, 'end_position': end})
+
+
+def test_segment_load_adds_and_takes_back_ranges():
+    load = SegmentLoad(4)
+    load.add(0, 1, 1)
+    load.add(1, 3, 1)
+    assert load.peak() == 2
+    assert load.peak(2, 3) == 1
+    load.add(1, 3, -1)
+    assert load.peak() == 1
+    assert load.peak(2, 3) == 0
+
+
+def test_rides_that_do_not_overlap_share_the_seat(app, bus):
+    client = app.test_client()
+    assert _board(client, 'seat-a@example.com', 'A', 'B').status_code == 201
+    assert _board(client, 'seat-b@example.com', 'B', 'C').status_code == 201
+
+    response = _board(client, 'seat-b@example.com', 'A', 'C')
+    assert response.status_code == 409
+    assert response.get_json()['capacity'] == 1
+    assert response.get_json()['peak_load'] == 1
+
+    with app.app_context():
+        assert db.session.get(Trip, 21).current_capacity == 1
+
+
+def test_ride_that_fails_to_save_does_not_keep_the_seat(app, bus, monkeypatch):
+    def broken_post(*args, **kwargs):
+        raise RuntimeError('ledger down')
+
+    client = app.test_client()
+    with monkeypatch.context() as patch:
+        patch.setattr(ledger, 'post', broken_post)
+        with pytest.raises(RuntimeError):
+            _board(client, 'seat-a@example.com', 'A', 'C')
+
+    assert _board(client, 'seat-b@example.com', 'A', 'C').status_code == 201
+
+
+def test_rides_saved_by_another_worker_are_counted(app, bus):
+    client = app.test_client()
+    # this process has read the trip before the other worker's ride
+    assert _board(client, 'seat-a@example.com', 'A', 'B').status_code == 201
+    with app.app_context():
+        db.session.add(CustomerTrip(customer_trip_id=9001, customer_email='seat-b@example.com',
+                                    start_position='B', end_position='C', trip_id=21,
+                                    refunded_credit=0, cost=20))
+        db.session.commit()
+
+    assert _board(client, 'seat-b@example.com', 'B', 'C').status_code == 409
@@ -0,0 +1,36 @@
+import pytest
+
+from db_config import db
+from models.models import User, Customer
+from utils.pagination import encode_cursor, decode_id_cursor
+
+
+@pytest.mark.parametrize('values', [[{}], [[1]], ['7'], [True], [1.5], [1, 2], []])
+def test_id_cursor_must_hold_one_integer(values):
+    with pytest.raises(ValueError):
+        decode_id_cursor(encode_cursor(values))
+
+
+def test_id_cursor_round_trips():
+    assert decode_id_cursor(encode_cursor([42])) == 42
+
+
+def test_forged_ride_history_cursor_is_rejected(app):
+    with app.app_context():
+        db.session.add(User(email='pages@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Customer(email='pages@example.com', balance=0))
+        db.session.commit()
+
+    client = app.test_client()
+    for values in ([{}], [[1]]):
+        response = client.get('/api/customers/pages@example.com/trips?cursor=' + encode_cursor(values))
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_forged_feedback_cursor_is_rejected(app):
+    client = app.test_client()
+    for values in ([{}], [[1]], ['1']):
+        response = client.get('/api/feedback/?cursor=' + encode_cursor(values))
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid cursor'
@@ -0,0 +1,9 @@
+from services.passwords import PasswordHasher
+
+
+def test_hash_and_check_in_spawned_workers():
+    hasher = PasswordHasher(pool_size=1, max_pending=2)
+    hashed = hasher.hash('secret')
+    assert hasher.check('secret', hashed)
+    assert not hasher.check('wrong', hashed)
+    assert hasher._get_pool()._mp_context.get_start_method() == 'spawn'
@@ -0,0 +1,88 @@
+from collections import deque
+from datetime import datetime
+
+import pytest
+
+from db_config import db
+from models.models import User, Employee, Driver, Trip
+from services.positions import PositionHub, position_hub
+from utils.response_cache import response_cache
+from utils.tokens import issue_token
+
+
+@pytest.fixture
+def trip(app):
+    with app.app_context():
+        for email in ('driver@example.com', 'other@example.com'):
+            db.session.add(User(email=email, name='N', sname='S', password='x', phone='1'))
+            db.session.add(Employee(email=email, department='ops'))
+            db.session.add(Driver(email=email, driver_license='L'))
+        db.session.add(Trip(trip_id=1, date_time=datetime(2025, 5, 1, 8, 0), current_capacity=0,
+                            driver_email='driver@example.com'))
+        db.session.commit()
+    position_hub.forget_drivers()
+    return 1
+
+
+def _headers(app, email, role='driver'):
+    with app.test_request_context():
+        return {'Authorization': 'Bearer ' + issue_token(email, role)}
+
+
+def test_push_needs_the_assigned_drivers_token(app, trip):
+    client = app.test_client()
+    body = {'latitude': 35.0, 'longitude': 33.0}
+    assert client.post('/api/trips/1/positions', json=body).status_code == 401
+    assert client.post('/api/trips/1/positions', json=body,
+                       headers=_headers(app, 'driver@example.com', 'customer')).status_code == 401
+    assert client.post('/api/trips/1/positions', json=body,
+                       headers=_headers(app, 'other@example.com')).status_code == 403
+    # the body's driver field no longer authorizes anything
+    assert client.post('/api/trips/1/positions', json={**body, 'driver': 'driver@example.com'},
+                       headers=_headers(app, 'other@example.com')).status_code == 403
+
+
+def test_push_converts_recorded_at_to_utc(app, trip):
+    client = app.test_client()
+    headers = _headers(app, 'driver@example.com')
+    response = client.post('/api/trips/1/positions', headers=headers, json={
+        'latitude': 35.0, 'longitude': 33.0, 'recorded_at': '2025-05-01T11:00:00+03:00'})
+    assert response.status_code == 202
+    assert response.get_json()['recorded_at'] == '2025-05-01T08:00:00'
+
+    response = client.post('/api/trips/1/positions', headers=headers, json={
+        'latitude': 35.0, 'longitude': 33.0, 'recorded_at': 'soon'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid recorded_at'
+
+
+def test_positions_leave_the_cached_trip_details_alone(app, trip):
+    response_cache.clear()
+    client = app.test_client()
+    details = client.get('/api/trips/1')
+    assert 'progress' not in details.get_json()
+
+    response = client.post('/api/trips/1/positions', headers=_headers(app, 'driver@example.com'),
+                           json={'latitude': 35.0, 'longitude': 33.0})
+    assert response.status_code == 202
+    assert client.get('/api/trips/1', headers={'If-None-Match': details.headers['ETag']}).status_code == 304
+
+
+def test_pending_positions_are_bounded(app, monkeypatch):
+    hub = PositionHub()
+    hub._pending = deque(maxlen=3)
+    for minute in range(5):
+        hub.publish(1, 35.0, 33.0, datetime(2025, 5, 1, 8, minute))
+    assert [row[3].minute for row in hub._pending] == [2, 3, 4]
+    assert hub.dropped == 2
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('database down')
+
+    # a failed flush keeps the rows, in order, for the next attempt
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'execute', fail)
+        with pytest.raises(RuntimeError):
+            hub.flush()
+    assert [row[3].minute for row in hub._pending] == [2, 3, 4]
+    assert hub.dropped == 2
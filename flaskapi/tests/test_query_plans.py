@@ -0,0 +1,21 @@
+import pytest
+
+from db_config import db
+from utils.query_plans import CHECKS, explain
+
+
+@pytest.mark.parametrize('name', sorted(CHECKS))
+def test_hot_query_uses_its_index(app, name):
+    statement, index = CHECKS[name]
+    with app.app_context():
+        plan = explain(statement)
+    assert any(index in line for line in plan), '%s should use %s:\n%s' % (name, index, '\n'.join(plan))
+
+
+def test_check_fails_without_the_index(app):
+    with app.app_context():
+        db.session.execute(db.text('DROP INDEX ix_feedback_support'))
+        db.session.commit()
+        statement, index = CHECKS['support inbox']
+        plan = explain(statement)
+    assert not any(index in line for line in plan)
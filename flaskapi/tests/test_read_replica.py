@@ -0,0 +1,64 @@
+from flask import g
+from sqlalchemy import select
+
+from db_config import db, REPLICA_BIND
+from models.models import User, Customer
+
+
+def _add_customer(connection, email):
+    connection.execute(User.__table__.insert(), {
+        'email': email, 'name': 'N', 'sname': 'S', 'password': 'x', 'phone': '1',
+    })
+    connection.execute(Customer.__table__.insert(), {'email': email, 'balance': 0})
+
+
+def _emails(engine):
+    with engine.connect() as connection:
+        return set(connection.execute(select(Customer.email)).scalars())
+
+
+def test_read_only_get_reads_from_replica(replica_app):
+    with replica_app.app_context():
+        with db.engines[REPLICA_BIND].begin() as connection:
+            _add_customer(connection, 'replica@example.com')
+        with db.engine.begin() as connection:
+            _add_customer(connection, 'primary@example.com')
+
+    client = replica_app.test_client()
+    # get_customer_trips is @read_only: it only sees the replica's customer
+    assert client.get('/api/customers/replica@example.com/trips').status_code == 200
+    assert client.get('/api/customers/primary@example.com/trips').status_code == 404
+    # get_customer is not: it reads the primary
+    assert client.get('/api/customers/primary@example.com').status_code == 200
+    assert client.get('/api/customers/replica@example.com').status_code == 404
+
+
+def test_post_and_put_write_to_primary(replica_app):
+    client = replica_app.test_client()
+    response = client.post('/api/customers/', json={
+        'email': 'new@example.com', 'name': 'N', 'sname': 'S', 'password': 'x', 'phone': '1',
+    })
+    assert response.status_code == 201
+    response = client.put('/api/customers/new@example.com', json={'phone': '2'})
+    assert response.status_code == 200
+
+    with replica_app.app_context():
+        assert _emails(db.engine) == {'new@example.com'}
+        assert _emails(db.engines[REPLICA_BIND]) == set()
+        with db.engine.connect() as connection:
+            phone = connection.execute(
+                select(User.phone).where(User.email == 'new@example.com')).scalar()
+        assert phone == '2'
+
+
+def test_flush_in_read_only_request_goes_to_primary(replica_app):
+    with replica_app.test_request_context():
+        g.use_replica = True
+        db.session.add(User(email='flush@example.com', name='N', sname='S', password='x', phone='1'))
+        db.session.add(Customer(email='flush@example.com', balance=0))
+        db.session.commit()
+
+        assert _emails(db.engine) == {'flush@example.com'}
+        assert _emails(db.engines[REPLICA_BIND]) == set()
+        # a plain SELECT in the same request is still served by the replica
+        assert db.session.query(Customer.email).all() == []
@@ -0,0 +1,41 @@
+from db_config import db
+from models.models import User, Employee, Support, Feedback
+from services.support_queue import support_assigner
+
+
+def _seed(app):
+    with app.app_context():
+        for email in ('busy@example.com', 'idle@example.com'):
+            db.session.add(User(email=email, name='N', sname='S', password='x', phone='1'))
+            db.session.add(Employee(email=email, department='support'))
+            db.session.add(Support(email=email))
+        for i in range(4):
+            db.session.add(Feedback(comment='c%d' % i, support='busy@example.com'))
+        db.session.commit()
+    support_assigner.reload()
+
+
+def _open_tickets(app):
+    with app.app_context():
+        rows = db.session.query(Feedback.support, db.func.count()) \
+            .filter(Feedback.response.is_(None)).group_by(Feedback.support)
+        return dict(rows)
+
+
+def test_answering_does_not_move_other_tickets(app):
+    _seed(app)
+    client = app.test_client()
+    response = client.patch('/api/feedback/1', json={'response': 'done'})
+    assert response.status_code == 200
+    assert _open_tickets(app) == {'busy@example.com': 3}
+
+
+def test_rebalance_evens_out_the_queues(app):
+    _seed(app)
+    response = app.test_client().post('/api/feedback/rebalance')
+    assert response.status_code == 200
+    moved = response.get_json()['moved']
+    assert [(m['from'], m['to']) for m in moved] == [('busy@example.com', 'idle@example.com')] * 2
+    assert _open_tickets(app) == {'busy@example.com': 2, 'idle@example.com': 2}
+    # already even: a second call moves nothing
+    assert app.test_client().post('/api/feedback/rebalance').get_json()['moved'] == []
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from db_config import db
+from models.models import Trip
+
+
+def test_pages_cover_undated_and_dated_trips(app):
+    with app.app_context():
+        db.session.execute(Trip.__table__.insert(), [
+            {'trip_id': 1, 'date_time': None, 'current_capacity': 0},
+            {'trip_id': 2, 'date_time': None, 'current_capacity': 0},
+            {'trip_id': 3, 'date_time': datetime(2025, 5, 2, 8, 0), 'current_capacity': 0},
+            {'trip_id': 4, 'date_time': datetime(2025, 5, 1, 8, 0), 'current_capacity': 0},
+        ])
+        db.session.commit()
+
+    client = app.test_client()
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/trips/?limit=1' + ('&cursor=' + cursor if cursor else ''))
+        assert response.status_code == 200
+        seen.extend(trip['trip_id'] for trip in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == [1, 2, 4, 3]
@@ -0,0 +1,58 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# Bodies smaller than this are sent as they are
+MIN_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _accepts(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+def compress_response(response):
+    """
+    after_request hook: gzip (or brotli, when installed and accepted) any
+    complete response of at least MIN_SIZE bytes. Streams such as SSE and
+    NDJSON exports are left alone.
+    """
+    response.vary.add('Accept-Encoding')
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype == 'text/event-stream'
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    if brotli is not None and _accepts('br'):
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif _accepts('gzip'):
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    # Same content, different bytes: the validator can only be weak now
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
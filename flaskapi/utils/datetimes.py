@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+# How trip times are shown to clients (the format the column used to hold)
+DATE_TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+# Accepted on input besides ISO 8601
+_INPUT_FORMATS = ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S')
+
+
+def parse_date_time(value, utc=False):
+    """
+    A naive datetime from an ISO 8601 string (or a datetime). Offsets are
+    dropped, keeping the wall-clock time; with utc=True they are converted
+    to UTC first instead, for event times compared with datetime.utcnow().
+    Raises ValueError otherwise.
+    """
+    if isinstance(value, datetime):
+        return _naive(value, utc)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError('is not a date and time')
+    value = value.strip()
+    try:
+        return _naive(datetime.fromisoformat(value), utc)
+    except ValueError:
+        pass
+    for fmt in _INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError('is not a date and time')
+
+
+def _naive(value, utc):
+    if utc and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.replace(tzinfo=None)
+
+
+def format_date_time(value):
+    return value.strftime(DATE_TIME_FORMAT) if value is not None else None
@@ -0,0 +1,24 @@
+from flask import Response, current_app, stream_with_context
+
+CHUNK_SIZE = 1000
+
+
+def wants_ndjson(args):
+    return args.get('format') == 'ndjson'
+
+
+def ndjson_response(query, to_dict, chunk_size=CHUNK_SIZE):
+    """
+    Stream a query as newline-delimited JSON, one object per line.
+
+    yield_per makes the driver use a server-side cursor and fetch
+    chunk_size rows at a time, so memory stays flat however large the
+    table is. Only many-to-one eager loads can be combined with it.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        for row in query.yield_per(chunk_size):
+            yield dumps(to_dict(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
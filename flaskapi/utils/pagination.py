@@ -0,0 +1,54 @@
+import base64
+import json
+
+from flask import jsonify
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def parse_limit(args, default=DEFAULT_LIMIT):
+    """Read ?limit= from the query string, clamped to [1, MAX_LIMIT]."""
+    limit = args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def encode_cursor(values):
+    """Pack the sort key of the last row into an opaque, url-safe token."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor. Raises ValueError on a malformed token."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def decode_id_cursor(token):
+    """
+    decode_cursor() for a cursor holding one integer id. Raises ValueError
+    for anything else, so a forged token never reaches SQL.
+    """
+    values = decode_cursor(token)
+    if len(values) != 1 or type(values[0]) is not int:
+        raise ValueError('Invalid cursor')
+    return values[0]
+
+
+def paginated_response(items, next_cursor):
+    """
+    Keep the body a plain JSON array (so existing clients keep working) and
+    hand the cursor for the next page back in the X-Next-Cursor header.
+    """
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    return response
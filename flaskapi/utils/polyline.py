@@ -0,0 +1,48 @@
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode(points, precision=5):
+    """
+    Encode [(lat, lon), ...] with the Google encoded polyline algorithm.
+    Each coordinate costs a few ASCII characters instead of a JSON float pair.
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        lat_i = int(round(lat * factor))
+        lon_i = int(round(lon * factor))
+        out.append(_encode_value(lat_i - prev_lat))
+        out.append(_encode_value(lon_i - prev_lon))
+        prev_lat, prev_lon = lat_i, lon_i
+    return ''.join(out)
+
+
+def decode(encoded, precision=5):
+    """Inverse of encode, returns [(lat, lon), ...]."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
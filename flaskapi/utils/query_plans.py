@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from db_config import db
+from models.models import CustomerTrip, Includes, Feedback, Trip
+
+# name -> (statement behind a hot endpoint, index its plan must use)
+CHECKS = {
+    'customer ride history': (
+        select(CustomerTrip.customer_trip_id)
+        .where(CustomerTrip.customer_email == 'customer@example.com')
+        .order_by(CustomerTrip.customer_trip_id.desc()),
+        'ix_customer_trip_customer',
+    ),
+    'rides on a trip': (
+        select(CustomerTrip.customer_trip_id).where(CustomerTrip.trip_id == 1),
+        'ix_customer_trip_trip_id',
+    ),
+    'trip stop sequence': (
+        select(Includes.name, Includes.stop_order)
+        .where(Includes.trip_id == 1)
+        .order_by(Includes.stop_order),
+        'ix_includes_trip_order',
+    ),
+    'support inbox': (
+        select(Feedback.feedback_id).where(Feedback.support == 'support@example.com'),
+        'ix_feedback_support',
+    ),
+    'customer feedback': (
+        select(Feedback.feedback_id).where(Feedback.customer == 'customer@example.com'),
+        'ix_feedback_customer',
+    ),
+    'trips in a time window': (
+        select(Trip.trip_id)
+        .where(Trip.date_time >= datetime(2025, 1, 1), Trip.date_time < datetime(2025, 1, 2))
+        .order_by(Trip.date_time),
+        'ix_trip_date_time',
+    ),
+}
+
+
+def explain(statement):
+    """The database's plan for statement, flattened to one line per plan row."""
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as connection:
+        rows = connection.execute(text(prefix + sql)).all()
+    return [' '.join(str(value) for value in row if value is not None) for row in rows]
+
+
+def check_query_plans():
+    """[(name, expected index, plan lines, ok)] for every entry of CHECKS."""
+    results = []
+    for name, (statement, index) in CHECKS.items():
+        plan = explain(statement)
+        results.append((name, index, plan, any(index in line for line in plan)))
+    return results
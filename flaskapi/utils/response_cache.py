@@ -0,0 +1,87 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+MAX_ENTRIES = 512
+TTL_SECONDS = 300
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized JSON responses with a TTL.
+
+    Every cached view names the entities it reads ('stops', 'trips',
+    ('trip', 5), ...). Writes call bump() on the entities they change, and
+    an entry only counts as fresh while the versions it was built from are
+    still current. Entries carry a strong ETag, so a matching If-None-Match
+    is answered with 304 without touching the database or re-serializing.
+
+    Versions are per process; in a multi-worker deployment the TTL bounds
+    how long another worker can serve a response older than a write.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, versions, body, etag)
+        self._versions = {}             # entity -> int
+        self._max_entries = max_entries
+        self._ttl = ttl
+
+    def bump(self, *entities):
+        with self._lock:
+            for entity in entities:
+                self._versions[entity] = self._versions.get(entity, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, *entities):
+        """
+        Decorator for GET views returning JSON. Each entity is a name, or a
+        callable taking the view's keyword arguments and returning one.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                deps = [e(**kwargs) if callable(e) else e for e in entities]
+                key = (request.endpoint, tuple(sorted(kwargs.items())), request.query_string)
+
+                with self._lock:
+                    versions = tuple(self._versions.get(d, 0) for d in deps)
+                    entry = self._entries.get(key)
+                    if entry and (entry[0] < time.monotonic() or entry[1] != versions):
+                        del self._entries[key]
+                        entry = None
+                    if entry:
+                        self._entries.move_to_end(key)
+
+                if entry is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.mimetype != 'application/json':
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()
+                    entry = (time.monotonic() + self._ttl, versions, body, etag)
+                    with self._lock:
+                        self._entries[key] = entry
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self._max_entries:
+                            self._entries.popitem(last=False)
+
+                _, _, body, etag = entry
+                if request.if_none_match.contains_weak(etag):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = current_app.response_class(body, mimetype='application/json')
+                response.set_etag(etag)
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,31 @@
+from flask import current_app, request
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+# Session tokens stay valid for 30 days unless configured otherwise
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='session-token')
+
+
+def issue_token(email, role):
+    """Signed, timestamped token carrying the user's email and role."""
+    return _serializer().dumps({'email': email, 'role': role})
+
+
+def read_token(token):
+    """Payload of a valid token, or None if it is forged or expired."""
+    max_age = current_app.config.get('SESSION_TOKEN_MAX_AGE', DEFAULT_MAX_AGE)
+    try:
+        return _serializer().loads(token, max_age=max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def request_token():
+    """Payload of the request's 'Authorization: Bearer <token>' header, or None."""
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer '):
+        return None
+    return read_token(auth[7:])
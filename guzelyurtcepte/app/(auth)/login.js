@@ -28,6 +28,7 @@ export default function Login() {
       login({
         email: data.user.email,
         role: data.user.role,
+        token: data.token, // /api/users/session ile şifresiz yenilenir
       });
 
        if (data.user.role === 'support') {
@@ -31,9 +31,9 @@ export default function EditProfileScreen() {
       return;
     }
     const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
-    fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}`)
+    fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/dashboard?fields=profile`)
       .then(r => r.json())
-      .then(json => {
+      .then(({ profile: json }) => {
         json.balance = Number(json.balance);
         setProfile(json);
         setName(json.name);
@@ -51,12 +51,11 @@ export default function EditProfileScreen() {
   const handleSave = async () => {
     const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
     try {
-      // include balance so your endpoint won't 400
+      // balance is not sent: it only changes through the ledger
       const body = {
         name,
         sname,
-        phone,
-        balance: profile.balance
+        phone
       };
       const res = await fetch(
         `http://${host}:5000/api/customers/${encodeURIComponent(profile.email)}`,
@@ -1,5 +1,5 @@
 // /app/index.js
-import React, { useState, useEffect, useContext } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
   View,
   TextInput,
@@ -10,53 +10,11 @@ import {
   Alert,
   ActivityIndicator,
 } from 'react-native';
-import { BusContext } from '../../utils/busContext';
 
-const API_KEY = '5b3ce3597851110001cf62484db6165f3f2349668bb2fb831c3ec50a';
 // Change this to the trip you want to load:
 const TRIP_ID = 1;
 
-/**
- * Calls ORS for a two-point driving route and returns travel time in seconds.
- */
-async function getETAFromORS(start, end, apiKey, profile = 'driving-car') {
-  const url = `https://api.openrouteservice.org/v2/directions/${profile}/geojson`;
-  const body = {
-    coordinates: [
-      [start.longitude, start.latitude],
-      [end.longitude,   end.latitude],
-    ],
-    instructions: false,
-  };
-
-  const res = await fetch(url, {
-    method:  'POST',
-    headers: {
-      'Authorization': apiKey,
-      'Content-Type':  'application/json',
-    },
-    body: JSON.stringify(body),
-  });
-  if (res.status === 403) {
-    throw new Error('ORS 403: Invalid or unauthorized API key');
-  }
-  if (!res.ok) {
-    const txt = await res.text();
-    throw new Error(`ORS ${res.status}: ${txt}`);
-  }
-
-  const data = await res.json();
-  const props = data.features?.[0]?.properties;
-  const duration = props?.summary?.duration ?? props?.segments?.[0]?.duration;
-  if (typeof duration !== 'number') {
-    throw new Error('Could not parse duration from ORS response');
-  }
-  return duration;
-}
-
 export default function TripDetailsPage() {
-  const { busPosition } = useContext(BusContext);
-
   // trip metadata + stops
   const [trip, setTrip]     = useState(null);
   const [stops, setStops]   = useState([]);
@@ -94,23 +52,20 @@ export default function TripDetailsPage() {
     s.name.toLowerCase().includes(query.toLowerCase())
   );
 
-  // when user taps a stop
+  // when user taps a stop: one backend call returns ETAs for every
+  // remaining stop of the trip
   const onSelectStop = async (stop) => {
-    if (!busPosition) {
-      return Alert.alert(
-        'Bus position unknown',
-        'Please open the Map tab first so we can get the simulated bus location.'
-      );
-    }
     try {
-      const durationSec = await getETAFromORS(
-        busPosition,
-        { latitude: stop.latitude, longitude: stop.longitude },
-        API_KEY,
-        'driving-car'
-      );
-      const mins = Math.floor(durationSec / 60);
-      const secs = Math.round(durationSec % 60);
+      const res = await fetch(`http://10.0.2.2:5000/api/trips/${TRIP_ID}/etas`);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const data = await res.json();
+      const match = data.etas.find(e => e.name === stop.name);
+      if (!match) {
+        setEtaText(`${stop.name}: bus has already passed this stop`);
+        return;
+      }
+      const mins = Math.floor(match.eta_seconds / 60);
+      const secs = Math.round(match.eta_seconds % 60);
       setEtaText(`ETA to ${stop.name}: ${mins}m ${secs}s`);
     } catch (e) {
       Alert.alert('Error calculating ETA', e.message);
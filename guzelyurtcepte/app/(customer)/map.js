@@ -1,21 +1,15 @@
 // /app/map.js
 import * as Location from 'expo-location';
-import React, { useEffect, useState, useContext, useMemo } from 'react';
+import React, { useEffect, useState, useContext } from 'react';
 import { ActivityIndicator, Image, StyleSheet, View } from 'react-native';
 import MapView, { Marker, Polyline } from 'react-native-maps';
 import busStopIcon from '../../assets/images/bus-stop.png';
 import busIcon     from '../../assets/images/bus-icon.png';
-import { getRouteFromORS } from '../../utils/getRoute';
+import { getTripShape }   from '../../utils/getRoute';
 import { BusContext }      from '../../utils/busContext';
 
-const API_KEY = '5b3ce3597851110001cf62484db6165f3f2349668bb2fb831c3ec50a';
 const TRIP_ID = 1;
 
-const viaPoints = [
-  { latitude: 35.246692, longitude: 33.037149 },
-  { latitude: 35.246333, longitude: 33.036731 },
-];
-
 export default function MapScreen() {
   const { busPosition, setBusPosition } = useContext(BusContext);
 
@@ -43,34 +37,21 @@ export default function MapScreen() {
     })();
   }, []);
 
-  // 3) Build ordered waypoints
-  const routeWaypoints = useMemo(() => {
-    if (stops.length < 2) return [];
-    return [
-      { latitude: stops[0].latitude, longitude: stops[0].longitude },
-      ...viaPoints,
-      ...stops.slice(1).map(s => ({
-        latitude:  s.latitude,
-        longitude: s.longitude
-      }))
-    ];
-  }, [stops]);
-
-  // 4) Fetch ORS once we have location + waypoints
+  // 3) Fetch the trip's precomputed route shape from the backend
   useEffect(() => {
-    if (!location || routeWaypoints.length < 2) return;
+    if (!location) return;
 
     (async () => {
       try {
-        const route = await getRouteFromORS(routeWaypoints, API_KEY);
+        const route = await getTripShape(TRIP_ID);
         setRouteCoords(route);
       } catch (e) {
-        console.error('ORS routing error:', e);
+        console.error('Route shape error:', e);
       }
     })();
-  }, [location, routeWaypoints]);
+  }, [location]);
 
-  // 5) Once ORS gives us coords, compute map region
+  // 4) Once we have the route coords, compute map region
   useEffect(() => {
     if (!routeCoords.length) return;
     const lats = routeCoords.map(p => p.latitude);
@@ -88,7 +69,7 @@ export default function MapScreen() {
     });
   }, [routeCoords]);
 
-  // 6) Initialize the bus at the start of the route (NEW effect)
+  // 5) Initialize the bus at the start of the route (NEW effect)
   useEffect(() => {
     if (routeCoords.length > 0) {
       setBusPosition(routeCoords[0]);
@@ -96,7 +77,7 @@ export default function MapScreen() {
     }
   }, [routeCoords, setBusPosition]);
 
-  // 7) Simulate the bus moving
+  // 6) Simulate the bus moving
   useEffect(() => {
     if (!routeCoords.length) return;
     const id = setInterval(() => {
@@ -109,7 +90,7 @@ export default function MapScreen() {
     return () => clearInterval(id);
   }, [routeCoords, setBusPosition]);
 
-  // 8) Loading—and then render
+  // 7) Loading—and then render
   if (!region) {
     return (
       <View style={styles.container}>
@@ -35,9 +35,9 @@ export default function ProfileScreen() {
     // on Android emulator use 10.0.2.2, on iOS localhost
     const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
 
-    fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}`)
+    fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/dashboard?fields=profile`)
       .then(r => r.json())
-      .then(json => {
+      .then(({ profile: json }) => {
         // ensure balance is numeric
         json.balance = Number(json.balance);
         setProfile(json);
@@ -56,7 +56,6 @@ export default function ProfileScreen() {
       Alert.alert('Invalid', 'Please enter a number.');
       return;
     }
-    const newBalance = profile.balance + delta;
     try {
       const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
       const res = await fetch(
@@ -64,7 +63,8 @@ export default function ProfileScreen() {
         {
           method: 'PUT',
           headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ balance: newBalance }),
+          // send only the amount; the server appends it to the balance ledger
+          body: JSON.stringify({ top_up: delta }),
         }
       );
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   View,
   ActivityIndicator,
@@ -25,29 +25,33 @@ export default function TripsScreen() {
   const [modalVisible, setModalVisible] = useState(false);
   const [startPoint, setStartPoint] = useState('');
   const [endPoint, setEndPoint] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  // Ride being booked and its Idempotency-Key, kept until the server
+  // confirms it so a re-tap after a lost response books it only once
+  const pendingRide = useRef(null);
+
+  // First page comes with the refund total in one round trip; later pages
+  // only ask for rides and are appended
+  const fetchDashboard = async cursor => {
+    const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
+    const base = `http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/dashboard`;
+    const res = await fetch(cursor
+      ? `${base}?fields=rides&cursor=${encodeURIComponent(cursor)}`
+      : `${base}?fields=rides,refunds`);
+    const json = await res.json();
+    setTrips(prev => cursor ? [...prev, ...json.rides.items] : json.rides.items);
+    setNextCursor(json.rides.next_cursor);
+    if (!cursor) {
+      setRefundedTotal(json.refunds.refunded_credit.toFixed(2));
+    }
+  };
 
   useEffect(() => {
     if (!user?.email) {
       setLoading(false);
       return;
     }
-    const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
-    fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/trips`)
-      .then(r => r.json())
-      .then(json => {
-        setTrips(json);
-         fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/refunded-total`)
-          .then(r => r.json())
-          .then(data => {
-            if (data?.refunded_credit !== undefined) {
-              setRefundedTotal(data.refunded_credit.toFixed(2));
-            }
-          })
-          .catch(err => {
-            console.error(err);
-            Alert.alert('Error', 'Could not load refunded total');
-          });
-      })
+    fetchDashboard(null)
       .catch(err => {
         console.error(err);
         Alert.alert('Error', 'Could not load trips');
@@ -57,33 +61,38 @@ export default function TripsScreen() {
 
 const handleStartTrip = async () => {
   const host = Platform.OS === 'android' ? '10.0.2.2' : 'localhost';
+  const tripId = 1;
+  const pending = pendingRide.current;
+  if (!pending || pending.tripId !== tripId || pending.start !== startPoint || pending.end !== endPoint) {
+    pendingRide.current = {
+      tripId,
+      start: startPoint,
+      end: endPoint,
+      key: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+    };
+  }
+  const idempotencyKey = pendingRide.current.key;
   try {
     const res = await fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/start-trip`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
       body: JSON.stringify({
         start_position: startPoint,
         end_position: endPoint,
-        trip_id: 1,
+        trip_id: tripId,
       }),
     });
 
     const data = await res.json();
     if (res.ok) {
+      pendingRide.current = null;
       Alert.alert("Success", "Trip added");
       setModalVisible(false);
       setStartPoint('');
       setEndPoint('');
 
-      // 🔁 Trip listesini yeniden al
-      const tripRes = await fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/trips`);
-      const tripData = await tripRes.json();
-      setTrips(tripData);
-
-      // 🔁 Refund bilgisini de yeniden al
-      const refundRes = await fetch(`http://${host}:5000/api/customers/${encodeURIComponent(user.email)}/refunded-total`);
-      const refundData = await refundRes.json();
-      setRefundedTotal(refundData.refunded_credit.toFixed(2));
+      // 🔁 Trip listesini ve refund bilgisini tek istekte yeniden al
+      await fetchDashboard(null);
 
       setLoading(false);
     } else {
@@ -121,7 +130,7 @@ const handleStartTrip = async () => {
 
       <FlatList
         data={trips}
-        keyExtractor={item => item.trip_id.toString()}
+        keyExtractor={item => item.customer_trip_id.toString()}
         ListEmptyComponent={() => <Text style={styles.empty}>You have no past trips.</Text>}
         renderItem={({ item }) => (
           <View style={styles.row}>
@@ -139,6 +148,7 @@ const handleStartTrip = async () => {
             </View>
           </View>
         )}
+        onEndReached={() => nextCursor && fetchDashboard(nextCursor).catch(console.error)}
       />
       <TouchableOpacity
         style={styles.fab}
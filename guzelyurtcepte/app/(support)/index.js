@@ -8,37 +8,98 @@ import {
   TextInput,
   Button,
   ActivityIndicator,
+  Alert,
 } from 'react-native';
+import { useAuth } from '../../utils/authContext';
+
+// The SSE connection is replaced once this much text has been read, since
+// XHR keeps the whole response in memory
+const MAX_STREAM_CHARS = 64 * 1024;
 
 export default function SupportScreen() {
+  const { user } = useAuth();    // { email }
   const [feedbacks, setFeedbacks] = useState([]);
   const [selected, setSelected] = useState(null);
   const [responseText, setResponseText] = useState('');
   const [sending, setSending] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [answered, setAnswered] = useState(false);
 
-useEffect(() => {
-  const fetchFeedbacks = async () => {
-    try {
-      const res = await fetch('http://10.0.2.2:5000/api/feedback/');
-      const data = await res.json();
+const API = 'http://10.0.2.2:5000/api/feedback';
+// The signed-in agent's inbox, open or answered feedback; used for both the
+// list and the event stream
+const filters = `support=${encodeURIComponent(user.email)}&answered=${answered}`;
 
-      const formatted = data.map(fb => ({
-        id: fb.feedback_id,
-        userEmail: fb.customer?.email || 'Unknown',
-        message: fb.comment,
-        responded: fb.response != null,
-        fullData: fb
-      }));
+const toItem = fb => ({
+  id: fb.feedback_id,
+  userEmail: fb.customer?.email || 'Unknown',
+  message: fb.comment,
+  responded: fb.response != null,
+  fullData: fb
+});
 
-      setFeedbacks(formatted);
-    } catch (error) {
-      console.error('Error fetching feedbacks:', error);
-      Alert.alert('Error', 'Could not load feedbacks from server.');
-    }
-  };
+// One page of the inbox; the server sends the next page's cursor in a header
+const fetchFeedbacks = async cursor => {
+  try {
+    const res = await fetch(`${API}/?${filters}` + (cursor ? `&cursor=${cursor}` : ''));
+    const data = await res.json();
+    const items = data.map(toItem);
+    const ids = new Set(items.map(item => item.id));
+    // pushed items may already be in the list; keep the fetched copy
+    setFeedbacks(prev => cursor
+      ? [...prev.filter(f => !ids.has(f.id)), ...items].sort((a, b) => a.id - b.id)
+      : items);
+    setNextCursor(res.headers.get('X-Next-Cursor'));
+  } catch (error) {
+    console.error('Error fetching feedbacks:', error);
+    Alert.alert('Error', 'Could not load feedbacks from server.');
+  }
+};
 
-  fetchFeedbacks();
-}, []);
+useEffect(() => {
+  fetchFeedbacks(null);
+
+  // New and reassigned feedback is pushed over Server-Sent Events instead
+  // of re-fetching the list; read through XHR progress since React Native
+  // has no EventSource
+  let current = null;
+  let next = null;
+  const connect = () => {
+    const xhr = new XMLHttpRequest();
+    let seen = 0;
+    xhr.onprogress = () => {
+      if (xhr === next) {
+        // The replacement is subscribed now; close the connection it replaces
+        current.abort();
+        current = xhr;
+        next = null;
+      }
+      const text = xhr.responseText;
+      const end = text.lastIndexOf('\n\n');
+      if (end < seen) return;
+      const chunk = text.slice(seen, end);
+      seen = end + 2;
+      chunk.split('\n\n').forEach(message => {
+        const data = message.split('\n').find(line => line.startsWith('data: '));
+        if (!data) return;
+        const item = toItem(JSON.parse(data.slice(6)));
+        // a reassigned ticket may have left this agent's inbox
+        const mine = item.fullData.support?.email === user.email;
+        setFeedbacks(prev => [...prev.filter(f => f.id !== item.id), ...(mine ? [item] : [])]
+          .sort((a, b) => a.id - b.id));
+      });
+      if (seen > MAX_STREAM_CHARS && xhr === current && !next) next = connect();
+    };
+    xhr.open('GET', `${API}/stream?${filters}`);
+    xhr.send();
+    return xhr;
+  };
+  current = connect();
+  return () => {
+    current.abort();
+    if (next) next.abort();
+  };
+}, [filters]);
 
   // Simulate sending a response
 const sendResponse = async () => {
@@ -53,7 +114,7 @@ const sendResponse = async () => {
       },
       body: JSON.stringify({
         response: responseText,
-        support: 'support1@example.com'  // opsiyonel, hardcoded örnek
+        support: user.email
       })
     });
 
@@ -63,11 +124,10 @@ const sendResponse = async () => {
     }
 
     // feedback listesini güncelle
-    setFeedbacks(prev =>
-      prev.map(f =>
-        f.id === selected.id ? { ...f, responded: true } : f
-      )
-    );
+    // an answered ticket leaves the open inbox
+    setFeedbacks(prev => answered
+      ? prev.map(f => f.id === selected.id ? { ...f, responded: true } : f)
+      : prev.filter(f => f.id !== selected.id));
 
     setSelected(null);
     setResponseText('');
@@ -111,6 +171,10 @@ const sendResponse = async () => {
   return (
     <View style={styles.container}>
       <Text style={styles.header}>User Feedbacks</Text>
+      <Button
+        title={answered ? 'Show open feedback' : 'Show answered feedback'}
+        onPress={() => setAnswered(!answered)}
+      />
       <FlatList
         data={feedbacks}
         keyExtractor={item => item.id.toString()}
@@ -126,6 +190,7 @@ const sendResponse = async () => {
           </TouchableOpacity>
         )}
         ItemSeparatorComponent={() => <View style={styles.separator} />}
+        onEndReached={() => nextCursor && fetchFeedbacks(nextCursor)}
       />
     </View>
   );
@@ -37,3 +37,38 @@ export const getRouteFromORS = async (waypoints, apiKey) => {
   // map [lon,lat] ➔ {latitude,longitude}
   return rawLines.map(([lon, lat]) => ({ latitude: lat, longitude: lon }));
 };
+
+// Decode a Google encoded polyline into [{ latitude, longitude }]
+export const decodePolyline = (encoded, precision = 5) => {
+  const factor = Math.pow(10, precision);
+  const points = [];
+  let index = 0, lat = 0, lon = 0;
+
+  while (index < encoded.length) {
+    const deltas = [];
+    for (let k = 0; k < 2; k++) {
+      let shift = 0, result = 0, byte;
+      do {
+        byte = encoded.charCodeAt(index++) - 63;
+        result |= (byte & 0x1f) << shift;
+        shift += 5;
+      } while (byte >= 0x20);
+      deltas.push(result & 1 ? ~(result >> 1) : result >> 1);
+    }
+    lat += deltas[0];
+    lon += deltas[1];
+    points.push({ latitude: lat / factor, longitude: lon / factor });
+  }
+  return points;
+};
+
+// Route geometry of a trip, precomputed by the backend
+export const getTripShape = async (tripId, host = '10.0.2.2') => {
+  const res = await fetch(`http://${host}:5000/api/trips/${tripId}/shape`);
+  if (!res.ok) {
+    console.error('Shape error', res.status, res.statusText);
+    return [];
+  }
+  const data = await res.json();
+  return decodePolyline(data.polyline, data.precision);
+};